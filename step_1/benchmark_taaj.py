@@ -0,0 +1,141 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+import torch
+import transformers
+from transformers import AutoTokenizer
+
+from taaj_backends import load_taaj_backend, BACKENDS
+from taaj_instrumentation import SpanRecorder, peak_rss_mb, reset_peak_rss, latency_summary
+from taaj_jury import tokenize_texts, score_token_ids
+
+BENCHMARK_MODEL_DIR = "../trained_taaj_models/fine_tuned_taaj_model_relevance_score"
+BENCHMARK_DIR = "benchmarks"
+BATCH_SIZES = [1, 4, 16]
+SEQUENCE_LENGTHS = [64, 128, 256, 512]
+THREAD_COUNTS = [1, 2, 4]
+WARMUP = 3
+REPEATS = 20
+SEED = 42
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def host_metadata() -> Dict[str, Any]:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+    }
+
+
+def synthetic_sequences(tokenizer, batch_size: int, seq_len: int, rng: random.Random) -> List[List[int]]:
+    # Exact-length id sequences ([CLS] ... [SEP]) drawn from the regular vocabulary, skipping
+    # the reserved/special range at the start of the BERT vocab.
+    body = seq_len - 2
+    return [[tokenizer.cls_token_id] + [rng.randrange(1000, tokenizer.vocab_size) for _ in range(body)]
+            + [tokenizer.sep_token_id] for _ in range(batch_size)]
+
+
+def run_config(model, tokenizer, batch_size: int, seq_len: int, warmup: int, repeats: int,
+               rng: random.Random) -> Dict[str, Any]:
+    # The forward pass uses exact-length ids so the sequence-length axis is precise; the
+    # tokenize span times the tokenizer on the decoded text of the same ids. The peak RSS is
+    # reset first, so it is this configuration's peak rather than the largest one so far.
+    sequences = synthetic_sequences(tokenizer, batch_size, seq_len, rng)
+    reset_peak_rss()
+    texts = tokenizer.batch_decode(sequences, skip_special_tokens=True)
+    spans = SpanRecorder()
+    for iteration in range(warmup + repeats):
+        if iteration == warmup:
+            spans.reset()
+        with spans.span("total"):
+            with spans.span("tokenize"):
+                tokenize_texts(texts, tokenizer)
+            score_token_ids(sequences, {"taaj": model}, tokenizer.pad_token_id, torch.device("cpu"),
+                            batch_size * seq_len, spans)
+    summary = spans.summary()
+    total_sec = summary["total"]["total_ms"] / 1000
+    return {
+        "spans": summary,
+        "throughput_seq_per_sec": batch_size * repeats / total_sec if total_sec else 0.0,
+        "throughput_tokens_per_sec": batch_size * seq_len * repeats / total_sec if total_sec else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmark(model_dir: str, backends: List[str], batch_sizes: List[int], seq_lens: List[int],
+                  thread_counts: List[int], warmup: int, repeats: int) -> Dict[str, Any]:
+    model_dir = Path(model_dir)
+    rng = random.Random(SEED)
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir / "tokenizer"), local_files_only=True)
+    report = {"metadata": host_metadata(), "model_dir": str(model_dir), "loads": [], "results": [],
+              # False where the peak cannot be reset: peak RSS values are then all-time peaks.
+              "peak_rss_per_config": reset_peak_rss()}
+    for backend in backends:
+        for threads in thread_counts:
+            torch.set_num_threads(threads)
+            reset_peak_rss()
+            rss_before = peak_rss_mb()
+            start = time.perf_counter_ns()
+            model = load_taaj_backend(model_dir / "final_model", backend, torch.device("cpu"), threads)
+            report["loads"].append({
+                "backend": backend,
+                "threads": threads,
+                "load": latency_summary([time.perf_counter_ns() - start]),
+                "peak_rss_mb": peak_rss_mb(),
+                "peak_rss_growth_mb": peak_rss_mb() - rss_before,
+            })
+            for batch_size in batch_sizes:
+                for seq_len in seq_lens:
+                    result = run_config(model, tokenizer, batch_size, seq_len, warmup, repeats, rng)
+                    result.update({"backend": backend, "threads": threads, "batch_size": batch_size,
+                                   "seq_len": seq_len})
+                    forward = result["spans"]["forward"]
+                    print(f"{backend:>5} threads={threads:<2} batch={batch_size:<3} seq={seq_len:<4} "
+                          f"forward p50={forward['p50_ms']:.2f}ms p99={forward['p99_ms']:.2f}ms "
+                          f"{result['throughput_seq_per_sec']:.1f} seq/s")
+                    report["results"].append(result)
+            del model
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TaaJ judge latency and throughput.")
+    parser.add_argument("--model-dir", default=BENCHMARK_MODEL_DIR, help="fine_tuned_taaj_model_<criterion> directory")
+    parser.add_argument("--backends", nargs="+", default=["fp32"], choices=BACKENDS)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=BATCH_SIZES)
+    parser.add_argument("--seq-lens", nargs="+", type=int, default=SEQUENCE_LENGTHS)
+    parser.add_argument("--threads", nargs="+", type=int, default=THREAD_COUNTS)
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default=None, help="JSON output path")
+    args = parser.parse_args()
+
+    benchmark = run_benchmark(args.model_dir, args.backends, args.batch_sizes, args.seq_lens, args.threads,
+                              args.warmup, args.repeats)
+    output = Path(args.output or f"{BENCHMARK_DIR}/taaj-{benchmark['metadata']['commit']}-"
+                                 f"{benchmark['metadata']['host']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(benchmark, indent=2))
+    print(f"Benchmark written to {output}")
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from typing import List, Dict, Any, Callable, Iterator, Tuple
+
+GENERATION_CONCURRENCY = 4
+JUDGE_BATCH_SIZE = 16
+KEEP_ALIVE = "30m"  # keeps the model, and with it Ollama's cached prompt prefix, loaded between calls
+
+
+def chat_messages(prompt: str, system: str = None) -> List[Dict[str, str]]:
+    # A fixed system message first keeps the static prompt text an identical, cacheable prefix.
+    messages = [{"role": "system", "content": system}] if system else []
+    return messages + [{"role": "user", "content": prompt}]
+
+
+async def generation_worker(client, model_name: str, prompts: Iterator[Tuple[int, str]], queue: asyncio.Queue,
+                            system: str = None, keep_alive: str = KEEP_ALIVE):
+    # Workers share one iterator, so at most `concurrency` chats are in flight at any time.
+    for index, prompt in prompts:
+        start_time = time.time()
+        response = await client.chat(model=model_name, messages=chat_messages(prompt, system), keep_alive=keep_alive)
+        duration = time.time() - start_time
+        await queue.put((index, response, duration))
+
+
+async def judging_stage(queue: asyncio.Queue, jury, on_result: Callable, judge_batch_size: int):
+    # Scores whatever generations have finished in one jury call on a worker thread, so
+    # generation keeps running while the judge is busy, then releases results in order.
+    loop = asyncio.get_running_loop()
+    pending: Dict[int, Tuple[Any, float, Any]] = {}
+    next_index = 0
+    finished = False
+    while not finished:
+        batch = [await queue.get()]
+        while not queue.empty() and len(batch) < judge_batch_size:
+            batch.append(queue.get_nowait())
+        finished = batch[-1] is None
+        batch = [item for item in batch if item is not None]
+
+        if jury and batch:
+            texts = [response['message']['content'] for _, response, _ in batch]
+            verdicts = await loop.run_in_executor(None, jury.evaluate, texts)
+        else:
+            verdicts = [None] * len(batch)
+        for (index, response, duration), verdict in zip(batch, verdicts):
+            pending[index] = (response, duration, verdict)
+
+        while next_index in pending:
+            on_result(next_index, *pending.pop(next_index))
+            next_index += 1
+
+
+async def run_generation_pipeline(client, model_name: str, prompts: List[str], jury, on_result: Callable,
+                                  concurrency: int = GENERATION_CONCURRENCY,
+                                  judge_batch_size: int = JUDGE_BATCH_SIZE, system: str = None,
+                                  keep_alive: str = KEEP_ALIVE):
+    # on_result(index, response, duration, verdict) is called once per prompt, in prompt order.
+    queue = asyncio.Queue(maxsize=2 * concurrency)
+    prompt_iter = iter(enumerate(prompts))
+    judge = asyncio.create_task(judging_stage(queue, jury, on_result, judge_batch_size))
+    workers = [asyncio.create_task(generation_worker(client, model_name, prompt_iter, queue, system, keep_alive))
+               for _ in range(concurrency)]
+
+    async def generate_all():
+        await asyncio.gather(*workers)
+        await queue.put(None)
+
+    try:
+        await asyncio.gather(generate_all(), judge)
+    finally:
+        for task in workers + [judge]:
+            task.cancel()
@@ -0,0 +1,163 @@
+import gc
+import multiprocessing
+import queue
+import time
+import traceback
+from typing import Callable, List, Dict, Any
+
+from ollama_models import canonical_model_name
+
+GRID_WORKERS = 2
+GRID_MAX_MODELS = 1
+PROGRESS_INTERVAL = 30.0
+
+
+def plan_grid(model_names: List[str], experiments: List[int], cell_size: int,
+              model_priority: Dict[str, int] = None) -> List[List[Dict[str, Any]]]:
+    # One task per (model, experiment) cell, grouped by Ollama model so a model is pulled and
+    # loaded once. Higher priority groups run first; ties keep the grid order. Each cell keeps
+    # the scenario offset it gets in a sequential run, so rows do not depend on the schedule.
+    model_priority = model_priority or {}
+    groups = []
+    for n, model_name in enumerate(model_names):
+        groups.append([{"model": model_name, "experiment": experiment,
+                        "offset": (n * len(experiments) + e) * cell_size,
+                        "priority": model_priority.get(model_name, 0)}
+                       for e, experiment in enumerate(experiments)])
+    return sorted(groups, key=lambda group: -group[0]["priority"])
+
+
+def format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def worker_loop(worker_id: int, tasks, events, run_cell: Callable, worker_init: Callable = None):
+    # run_cell may return a dict of counters (e.g. score cache hits); they only exist in this
+    # process, so they travel back to the parent with the "done" event.
+    if worker_init:
+        worker_init(worker_id)
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        events.put(("start", worker_id, task, None))
+        try:
+            counters = run_cell(task) or {}
+        except Exception:
+            events.put(("error", worker_id, task, traceback.format_exc()))
+        else:
+            events.put(("done", worker_id, task, counters))
+
+
+class GridScheduler:
+    # Runs grid cells on forked worker processes. Whatever the parent has loaded before run()
+    # (the jury's weights above all) is shared copy-on-write with every worker instead of being
+    # loaded once per process. The parent only hands a cell out when a worker is idle, so it
+    # decides the order: cells of at most max_models model groups run at once (by default one,
+    # so a model's last cells finish before the next model is loaded), while the next model is
+    # pulled in the background. Counters returned by run_cell are summed into self.counters.
+    def __init__(self, run_cell: Callable, workers: int = GRID_WORKERS, model_manager=None,
+                 worker_init: Callable = None, progress_interval: float = PROGRESS_INTERVAL,
+                 max_models: int = GRID_MAX_MODELS):
+        self.run_cell = run_cell
+        self.workers = workers
+        self.model_manager = model_manager
+        self.worker_init = worker_init
+        self.progress_interval = progress_interval
+        self.max_models = max_models
+        self.counters: Dict[str, float] = {}
+        self.context = multiprocessing.get_context("fork")
+
+    def activate(self, groups: List[List[Dict[str, Any]]], running: Dict[str, int]):
+        group = groups.pop(0)
+        model_name = group[0]["model"]
+        if self.model_manager:
+            next_model = groups[0][0]["model"] if groups else None
+            keep = [name for name, count in running.items() if count] + ([next_model] if next_model else [])
+            self.model_manager.ensure(model_name, keep=keep)
+            if next_model:
+                self.model_manager.prefetch(next_model)
+        return sorted(group, key=lambda task: -task["priority"])
+
+    def print_progress(self, done: int, total: int, start_time: float, running: Dict[str, int]):
+        elapsed = time.time() - start_time
+        eta = elapsed / done * (total - done) if done else 0.0
+        models = ", ".join(f"{name} x{count}" for name, count in running.items() if count) or "-"
+        print(f"[grid] {done}/{total} cells done, elapsed {format_seconds(elapsed)}, "
+              f"ETA {format_seconds(eta) if done else '?'}, running: {models}")
+
+    def run(self, groups: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        groups = [list(group) for group in groups if group]
+        total = sum(len(group) for group in groups)
+        tasks = self.context.Queue()
+        events = self.context.Queue()
+        # Objects that exist now are never collected, so the GC does not write to (and copy)
+        # their pages in the workers.
+        gc.freeze()
+        processes = [self.context.Process(target=worker_loop, name=f"grid-worker-{worker_id}", daemon=True,
+                                          args=(worker_id, tasks, events, self.run_cell, self.worker_init))
+                     for worker_id in range(min(self.workers, total))]
+        for process in processes:
+            process.start()
+
+        start_time = time.time()
+        active: List[Dict[str, Any]] = []
+        running: Dict[str, int] = {}
+        # Generation time per model is the wall time during which any of its cells runs, not
+        # the sum of its cells, which overlap on parallel workers.
+        model_started: Dict[str, float] = {}
+        failures = []
+        in_flight = 0
+        done = 0
+        try:
+            while done < total:
+                while in_flight < len(processes):
+                    if not active:
+                        if not groups or sum(1 for count in running.values() if count) >= self.max_models:
+                            break
+                        active = self.activate(groups, running)
+                    task = active.pop(0)
+                    if not running.get(task["model"]):
+                        model_started[task["model"]] = time.time()
+                    running[task["model"]] = running.get(task["model"], 0) + 1
+                    tasks.put(task)
+                    in_flight += 1
+
+                try:
+                    kind, worker_id, task, payload = events.get(timeout=self.progress_interval)
+                except queue.Empty:
+                    if not all(process.is_alive() for process in processes):
+                        raise RuntimeError("A grid worker exited unexpectedly; rerun to resume the grid")
+                    self.print_progress(done, total, start_time, running)
+                    continue
+                if kind == "start":
+                    continue
+
+                in_flight -= 1
+                done += 1
+                running[task["model"]] -= 1
+                model_name = canonical_model_name(task["model"])
+                if not running[task["model"]]:
+                    generate_sec = time.time() - model_started.pop(task["model"])
+                    if self.model_manager:
+                        self.model_manager.timing(model_name)["generate_sec"] += generate_sec
+                if kind == "error":
+                    print(f"[grid] worker {worker_id} failed on {task['model']} experiment {task['experiment']}:\n{payload}")
+                    failures.append({**task, "error": payload})
+                else:
+                    for key, value in payload.items():
+                        self.counters[key] = self.counters.get(key, 0) + value
+                    if self.model_manager:
+                        self.model_manager.touch(model_name)
+                self.print_progress(done, total, start_time, running)
+        finally:
+            for _ in processes:
+                tasks.put(None)
+            for process in processes:
+                process.join(timeout=self.progress_interval)
+                if process.is_alive():
+                    process.terminate()
+            gc.unfreeze()
+        return failures
@@ -0,0 +1,190 @@
+import argparse
+import csv
+import datetime
+import glob
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+# Offline stand-in for the Ollama chat API (/api/chat, /api/tags, /api/version) that replays
+# responses from earlier result CSVs with simulated latency. Point the pipeline at it with
+#   OLLAMA_HOST=http://127.0.0.1:11435 python script_generate_dataset.py
+
+MOCK_HOST = "127.0.0.1"
+MOCK_PORT = 11435
+RESPONSE_CSV_PATTERN = "data/cry*_exp*-responses-*.csv"
+TIME_TO_FIRST_TOKEN = 0.2
+TOKENS_PER_SECOND = 20.0
+PREFILL_TOKENS_PER_SECOND = 200.0
+LATENCY_JITTER = 0.1
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def load_responses(pattern: str) -> List[str]:
+    responses = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, newline='', encoding='utf-8') as f:
+            responses.extend(row["response"] for row in csv.DictReader(f) if row.get("response"))
+    return responses
+
+
+def timestamp() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        return None
+
+    def send_json(self, payload, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self.send_json({"version": "0.0.0-mock"})
+        elif self.path == "/api/tags":
+            self.send_json({"models": [{"name": name, "model": name, "size": 0} for name in self.server.models_seen]})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/api/chat":
+            self.send_json({"error": "not found"}, 404)
+            return
+        self.server.models_seen.add(request.get("model", ""))
+        prompt = "".join(message.get("content", "") for message in request.get("messages", []))
+        content = self.server.pick_response(prompt)
+        tokens = TOKEN_PATTERN.findall(content) or [""]
+        prompt_eval = self.server.evaluate_prompt(request.get("model", ""), TOKEN_PATTERN.findall(prompt))
+        # Ollama streams unless the request explicitly sets "stream": false.
+        if request.get("stream", True):
+            self.stream_chat(request, prompt_eval, tokens)
+        else:
+            self.server.sleep(self.server.ttft + prompt_eval[1] + len(tokens) / self.server.tokens_per_sec)
+            self.send_json(self.final_chunk(request, prompt_eval, tokens, content))
+
+    def final_chunk(self, request, prompt_eval, tokens: List[str], content: str):
+        eval_duration = int(len(tokens) / self.server.tokens_per_sec * 1e9)
+        prompt_eval_count, prompt_eval_seconds = prompt_eval
+        prompt_eval_duration = int(prompt_eval_seconds * 1e9)
+        return {
+            "model": request.get("model", ""),
+            "created_at": timestamp(),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(self.server.ttft * 1e9) + prompt_eval_duration + eval_duration,
+            "load_duration": 0,
+            "prompt_eval_count": prompt_eval_count,
+            "prompt_eval_duration": prompt_eval_duration,
+            "eval_count": len(tokens),
+            "eval_duration": eval_duration,
+        }
+
+    def stream_chat(self, request, prompt_eval, tokens: List[str]):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.server.sleep(self.server.ttft + prompt_eval[1])
+        try:
+            for token in tokens:
+                self.write_chunk({"model": request.get("model", ""), "created_at": timestamp(),
+                                  "message": {"role": "assistant", "content": token}, "done": False})
+                self.server.sleep(1 / self.server.tokens_per_sec)
+            final = self.final_chunk(request, prompt_eval, tokens, "")
+            self.write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the generation (e.g. early stopping); just stop streaming.
+            self.close_connection = True
+
+    def write_chunk(self, payload):
+        data = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, address, responses: List[str], ttft: float = TIME_TO_FIRST_TOKEN,
+                 tokens_per_sec: float = TOKENS_PER_SECOND, jitter: float = LATENCY_JITTER,
+                 prefill_tokens_per_sec: float = PREFILL_TOKENS_PER_SECOND):
+        super().__init__(address, MockOllamaHandler)
+        if not responses:
+            raise ValueError("The mock Ollama server needs at least one recorded response")
+        self.responses = responses
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.prefill_tokens_per_sec = prefill_tokens_per_sec
+        self.jitter = jitter
+        self.models_seen = set()
+        self.cached_prompts = {}
+        self.lock = threading.Lock()
+
+    def evaluate_prompt(self, model: str, prompt_tokens: List[str]):
+        # Like Ollama's prompt cache, only the tokens after the prefix shared with the model's
+        # previous prompt are evaluated. The first token arrives after the fixed ttft plus the
+        # prefill time of those tokens. Returns (prompt_eval_count, prompt_eval_seconds).
+        with self.lock:
+            previous = self.cached_prompts.get(model, [])
+            self.cached_prompts[model] = prompt_tokens
+        shared = 0
+        for old, new in zip(previous, prompt_tokens):
+            if old != new:
+                break
+            shared += 1
+        evaluated = max(len(prompt_tokens) - shared, 1)
+        return evaluated, evaluated / self.prefill_tokens_per_sec
+
+    def pick_response(self, prompt: str) -> str:
+        # The same prompt always replays the same recorded response.
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        return self.responses[digest % len(self.responses)]
+
+    def sleep(self, seconds: float):
+        if self.jitter:
+            seconds *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(max(seconds, 0.0))
+
+
+def start_mock_server(responses: List[str], host: str = MOCK_HOST, port: int = 0, **kwargs) -> MockOllamaServer:
+    # Serves on a background thread; port 0 picks a free port (see server.server_address).
+    server = MockOllamaServer((host, port), responses, **kwargs)
+    threading.Thread(target=server.serve_forever, name="mock-ollama", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded responses through an Ollama-compatible API.")
+    parser.add_argument("--host", default=MOCK_HOST)
+    parser.add_argument("--port", type=int, default=MOCK_PORT)
+    parser.add_argument("--csv", default=RESPONSE_CSV_PATTERN, help="glob of result CSVs to replay")
+    parser.add_argument("--ttft", type=float, default=TIME_TO_FIRST_TOKEN,
+                        help="fixed time to first token (s), before prompt prefill")
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=PREFILL_TOKENS_PER_SECOND,
+                        help="prompt evaluation speed for the tokens not in the prompt cache")
+    parser.add_argument("--tokens-per-sec", type=float, default=TOKENS_PER_SECOND)
+    parser.add_argument("--jitter", type=float, default=LATENCY_JITTER, help="relative latency jitter")
+    args = parser.parse_args()
+
+    mock_server = MockOllamaServer((args.host, args.port), load_responses(args.csv), args.ttft,
+                                   args.tokens_per_sec, args.jitter, args.prefill_tokens_per_sec)
+    print(f"Mock Ollama serving {len(mock_server.responses)} responses on http://{args.host}:{args.port}")
+    mock_server.serve_forever()
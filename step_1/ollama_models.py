@@ -0,0 +1,134 @@
+import json
+import re
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any
+
+OLLAMA_BIN = "ollama"
+MODEL_USAGE_PATH = "data/ollama_model_usage.json"
+SIZE_UNITS = {"B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+LIST_LINE = re.compile(r"^(\S+)\s+([0-9a-f]+)\s+([\d.]+)\s*([KMGT]?B)\b", re.IGNORECASE)
+
+
+def canonical_model_name(name: str) -> str:
+    return name if ":" in name else f"{name}:latest"
+
+
+def parse_ollama_list(output: str) -> Dict[str, int]:
+    # `ollama list` prints NAME, ID, SIZE ("4.1 GB") and MODIFIED columns after a header.
+    models = {}
+    for line in output.splitlines():
+        match = LIST_LINE.match(line.strip())
+        if match:
+            name, _, size, unit = match.groups()
+            models[canonical_model_name(name)] = int(float(size) * SIZE_UNITS[unit.upper()])
+    return models
+
+
+class OllamaModelManager:
+    # Keeps the grid's models installed within a disk budget. Models are only evicted if this
+    # manager pulled or used them (least recently used first), never other local models.
+    def __init__(self, disk_budget_bytes: int, ollama_bin: str = OLLAMA_BIN, usage_path: str = MODEL_USAGE_PATH):
+        self.disk_budget_bytes = disk_budget_bytes
+        self.ollama_bin = ollama_bin
+        self.usage_path = Path(usage_path)
+        self.usage = json.loads(self.usage_path.read_text()) if self.usage_path.exists() else {}
+        self.lock = threading.Lock()
+        self.prefetches: Dict[str, threading.Thread] = {}
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        # Without the CLI (e.g. generating against a remote or mock server via OLLAMA_HOST)
+        # the models are assumed to be served already and residency is not managed.
+        self.enabled = shutil.which(ollama_bin) is not None
+        if not self.enabled:
+            print(f"Warning: {ollama_bin!r} not found, Ollama models will not be pulled or evicted")
+
+    def ollama(self, *args) -> str:
+        result = subprocess.run([self.ollama_bin, *args], capture_output=True, text=True, check=True)
+        return result.stdout
+
+    def installed(self) -> Dict[str, int]:
+        return parse_ollama_list(self.ollama("list"))
+
+    def timing(self, name: str) -> Dict[str, float]:
+        return self.timings.setdefault(name, {"pull_sec": 0.0, "wait_sec": 0.0, "generate_sec": 0.0})
+
+    def touch(self, name: str):
+        with self.lock:
+            self.usage[name] = time.time()
+            self.usage_path.parent.mkdir(parents=True, exist_ok=True)
+            self.usage_path.write_text(json.dumps(self.usage, indent=2))
+
+    def pull(self, name: str):
+        print(f"Pulling Ollama model: {name}")
+        start_time = time.time()
+        try:
+            self.ollama("pull", name)
+        except subprocess.CalledProcessError as e:
+            self.errors[name] = e.stderr.strip()
+            print(f"Error pulling {name}: {self.errors[name]}")
+            return
+        self.timing(name)["pull_sec"] += time.time() - start_time
+        self.touch(name)
+        print(f"Model {name} pulled in {self.timing(name)['pull_sec']:.1f}s.")
+
+    def prefetch(self, name: str):
+        # Pull the next model of the grid in the background while the current one generates.
+        name = canonical_model_name(name)
+        if not self.enabled or name in self.prefetches or name in self.installed():
+            return
+        thread = threading.Thread(target=self.pull, args=(name,), name=f"prefetch-{name}", daemon=True)
+        self.prefetches[name] = thread
+        thread.start()
+
+    def ensure(self, name: str, keep=()):
+        name = canonical_model_name(name)
+        if not self.enabled:
+            return
+        start_time = time.time()
+        if name in self.prefetches:
+            self.prefetches.pop(name).join()
+            self.timing(name)["wait_sec"] += time.time() - start_time
+        if name not in self.installed():
+            self.errors.pop(name, None)
+            self.pull(name)
+            if name in self.errors:
+                raise RuntimeError(f"Could not pull Ollama model {name}: {self.errors[name]}")
+        self.touch(name)
+        self.evict(keep={name, *map(canonical_model_name, keep), *self.prefetches})
+
+    def evict(self, keep=()):
+        if not self.enabled:
+            return
+        installed = self.installed()
+        used = sum(installed.values())
+        candidates = sorted((m for m in installed if m in self.usage and m not in keep), key=self.usage.get)
+        for name in candidates:
+            if used <= self.disk_budget_bytes:
+                break
+            print(f"Evicting Ollama model {name} ({installed[name] / 1e9:.1f} GB) to stay within disk budget")
+            self.ollama("rm", name)
+            used -= installed[name]
+            with self.lock:
+                self.usage.pop(name, None)
+        if used > self.disk_budget_bytes:
+            print(f"Warning: Ollama models use {used / 1e9:.1f} GB, over the "
+                  f"{self.disk_budget_bytes / 1e9:.1f} GB budget")
+
+    @contextmanager
+    def generating(self, name: str):
+        name = canonical_model_name(name)
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.timing(name)["generate_sec"] += time.time() - start_time
+            self.touch(name)
+
+    def report(self) -> Dict[str, Any]:
+        totals = {key: sum(t[key] for t in self.timings.values()) for key in ("pull_sec", "wait_sec", "generate_sec")}
+        return {"models": self.timings, "totals": totals}
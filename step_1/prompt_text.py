@@ -61,4 +61,17 @@ Instructions:
 7. Conclude with encouragement and a reminder to prioritize personal and environmental safety, and to monitor key conditions.
 
 """
-}
\ No newline at end of file
+}
+
+# Prefix-cache-friendly layout: the static part of each template (role, instructions, few-shot
+# examples) becomes a fixed system message and only the scenario data follows in the user
+# message, so Ollama can reuse the cached prompt prefix across scenarios instead of
+# re-evaluating hundreds of identical tokens for every generation.
+fewshot_head, fewshot_tail = detailed_fewshot_prompt.split("%%data_preamble%%")
+SYSTEM_PROMPTS = {
+    1: PROMPT_TEMPLATES[1].removeprefix(data_preamble).strip(),
+    2: PROMPT_TEMPLATES[2].removeprefix(data_preamble).strip(),
+    3: fewshot_head.strip() + "\n\n" + fewshot_tail.strip(),
+    4: PROMPT_TEMPLATES[4].removeprefix(data_preamble).strip(),
+}
+SCENARIO_TEMPLATE = data_preamble.strip()
@@ -0,0 +1,267 @@
+import argparse
+import csv
+import glob
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+RESULT_FORMATS = ["csv", "parquet"]
+RESULT_BUFFER_ROWS = 256
+PARQUET_ROW_GROUP_SIZE = 1024
+PARQUET_PART_ROW_GROUPS = 8
+NULL_VALUES = {"", "N/A", None}
+
+STRING_COLUMNS = {"prompt", "response", "farm_type", "rainfall_state", "sunshine_intensity"}
+INT_COLUMNS = {"#", "token_count", "days_since_planting", "summary_hours", "attempts", "aborted_tokens"}
+
+
+def column_kind(name: str) -> str:
+    if name in STRING_COLUMNS:
+        return "string"
+    if name in INT_COLUMNS or name.endswith("_prediction") or name.endswith("_count"):
+        return "int"
+    return "float"
+
+
+def coerce(value, kind: str):
+    if value in NULL_VALUES:
+        return None
+    if kind == "int":
+        return int(float(value))
+    if kind == "float":
+        return float(value)
+    return str(value)
+
+
+def infer_kinds(columns: List[str], rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    # Columns take their expected type unless a sample value does not parse as it, in
+    # which case they stay strings rather than failing the whole write.
+    kinds = {}
+    for name in columns:
+        kind = column_kind(name)
+        try:
+            for row in rows:
+                coerce(row.get(name), kind)
+        except (TypeError, ValueError):
+            kind = "string"
+        kinds[name] = kind
+    return kinds
+
+
+def arrow_table(rows: List[Dict[str, Any]], kinds: Dict[str, str]):
+    import pyarrow as pa
+
+    types = {"int": pa.int64(), "float": pa.float64(), "string": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in kinds.items()])
+    return pa.table({name: [coerce(row.get(name), kind) for row in rows] for name, kind in kinds.items()},
+                    schema=schema)
+
+
+def existing_columns(path: str) -> List[str]:
+    # Columns of the results already at path, [] if there are none: the CSV header, or the
+    # schema of the first part of a Parquet dataset.
+    path = Path(path)
+    if path.is_dir():
+        parts = sorted(path.glob("part-*.parquet"))
+        if not parts:
+            return []
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(str(parts[0])).names
+    if not path.is_file() or path.stat().st_size == 0:
+        return []
+    with open(path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+
+def rotate_results(path: str) -> str:
+    # Moves results (and their manifest) aside to <path>.superseded-<time>, which the
+    # *.csv / *.parquet result globs do not pick up, so the cell can start a fresh file.
+    rotated = f"{path}.superseded-{time.strftime('%Y%m%d-%H%M%S')}"
+    os.replace(path, rotated)
+    if os.path.exists(f"{path}.manifest.json"):
+        os.replace(f"{path}.manifest.json", f"{rotated}.manifest.json")
+    return rotated
+
+
+# Sinks return (the "#" of every row made durable by the call, CSV length) from write() and
+# close(); only the row numbers are kept, never the rows themselves.
+class CsvSink:
+    def __init__(self, path: str):
+        self.path = path
+        self.fieldnames = None
+
+    def write(self, rows: List[Dict[str, Any]]):
+        columns = list(rows[0].keys())
+        if self.fieldnames is None:
+            self.fieldnames = existing_columns(self.path) or None
+        # Appending rows with other columns under an existing header would shift every value
+        # into the wrong column, so a mismatch is refused; same columns in another order are fine.
+        if self.fieldnames is not None and sorted(self.fieldnames) != sorted(columns):
+            raise ValueError(f"Cannot append to {self.path}: its header has columns {self.fieldnames}, "
+                             f"the new rows have {columns}; move the file aside or use another result path")
+        with open(self.path, mode='a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames or columns)
+            if self.fieldnames is None:
+                writer.writeheader()
+                self.fieldnames = columns
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        return [row["#"] for row in rows], os.path.getsize(self.path)
+
+    def close(self):
+        return [], 0
+
+
+class ParquetSink:
+    # Writes a directory dataset (<name>.parquet/part-NNNNN.parquet) with typed columns.
+    # A part only becomes visible once its footer is written and it is renamed into place,
+    # so a crash never leaves an unreadable file behind; its rows are simply not committed.
+    # A part is finished every part_row_groups row groups, so rows reach the manifest as the
+    # run goes instead of all at close().
+    def __init__(self, path: str, row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+                 part_row_groups: int = PARQUET_PART_ROW_GROUPS):
+        import pyarrow  # noqa: F401  (fail early if the optional dependency is missing)
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.part_row_groups = part_row_groups
+        self.part_path = None
+        self.tmp_path = None
+        self.writer = None
+        self.kinds = None
+        self.pending: List[Dict[str, Any]] = []
+        self.part_row_numbers: List[Any] = []
+        self.part_groups = 0
+
+    def write_group(self, rows: List[Dict[str, Any]]):
+        import pyarrow.parquet as pq
+
+        if self.kinds is None:
+            self.kinds = infer_kinds(list(rows[0].keys()), rows)
+        table = arrow_table(rows, self.kinds)
+        if self.writer is None:
+            self.part_path = self.path / f"part-{len(list(self.path.glob('part-*.parquet'))):05d}.parquet"
+            self.tmp_path = self.part_path.with_suffix(".inprogress")
+            self.writer = pq.ParquetWriter(str(self.tmp_path), table.schema, compression="zstd")
+        self.writer.write_table(table)
+        self.part_row_numbers.extend(row["#"] for row in rows)
+        self.part_groups += 1
+
+    def finish_part(self) -> List[Any]:
+        if self.writer is None:
+            return []
+        self.writer.close()
+        os.replace(self.tmp_path, self.part_path)
+        row_numbers = self.part_row_numbers
+        self.writer = None
+        self.part_row_numbers = []
+        self.part_groups = 0
+        return row_numbers
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self.pending.extend(rows)
+        committed = []
+        while len(self.pending) >= self.row_group_size:
+            group, self.pending = self.pending[:self.row_group_size], self.pending[self.row_group_size:]
+            self.write_group(group)
+            if self.part_groups >= self.part_row_groups:
+                committed.extend(self.finish_part())
+        return committed, 0
+
+    def close(self):
+        if self.pending:
+            self.write_group(self.pending)
+            self.pending = []
+        return self.finish_part(), 0
+
+
+class BackgroundSink:
+    # Moves result writing off the generation thread. Rows go through a bounded queue, so
+    # a slow disk applies back-pressure instead of growing memory; on_commit(row_numbers, size)
+    # runs on the writer thread once rows are durable.
+    def __init__(self, sink, on_commit: Callable = None, flush_rows: int = 1,
+                 max_buffered_rows: int = RESULT_BUFFER_ROWS):
+        self.sink = sink
+        self.on_commit = on_commit
+        self.flush_rows = flush_rows
+        self.queue = queue.Queue(maxsize=max_buffered_rows)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="result-sink", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        finished = False
+        while not finished:
+            # Collect at least flush_rows rows (plus whatever else is already queued) per write.
+            batch = []
+            while True:
+                row = self.queue.get()
+                if row is None:
+                    finished = True
+                    break
+                batch.append(row)
+                if len(batch) >= self.flush_rows and self.queue.empty():
+                    break
+            if self.error or not batch:
+                continue
+            try:
+                self.commit(*self.sink.write(batch))
+            except Exception as e:
+                self.error = e
+
+    def commit(self, row_numbers: List[Any], size: int):
+        if self.on_commit and row_numbers:
+            self.on_commit(row_numbers, size)
+
+    def submit(self, row: Dict[str, Any]):
+        if self.error:
+            raise self.error
+        self.queue.put(row)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error
+        self.commit(*self.sink.close())
+
+
+def open_result_sink(path: str, result_format: str = "csv"):
+    if result_format == "csv":
+        return CsvSink(path)
+    if result_format == "parquet":
+        return ParquetSink(path)
+    raise ValueError(f"Unknown result format {result_format!r}, expected one of {RESULT_FORMATS}")
+
+
+def convert_csv_to_parquet(csv_path: str, parquet_path: str = None) -> str:
+    # Produces the same <name>.parquet/part-00000.parquet layout as ParquetSink, so converted
+    # and freshly generated results are read the same way (pyarrow.parquet.read_table(dir)).
+    import pyarrow.parquet as pq
+
+    parquet_path = Path(parquet_path or Path(csv_path).with_suffix(".parquet"))
+    if parquet_path.exists() and any(parquet_path.iterdir()):
+        raise FileExistsError(f"{parquet_path} already holds Parquet parts")
+    parquet_path.mkdir(parents=True, exist_ok=True)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise ValueError(f"{csv_path} has no rows")
+    table = arrow_table(rows, infer_kinds(list(rows[0].keys()), rows))
+    pq.write_table(table, str(parquet_path / "part-00000.parquet"), row_group_size=PARQUET_ROW_GROUP_SIZE,
+                   compression="zstd")
+    return str(parquet_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert response CSVs to typed Parquet files.")
+    parser.add_argument("pattern", nargs="?", default="data/cry*_exp*-responses-*.csv")
+    args = parser.parse_args()
+    for path in sorted(glob.glob(args.pattern)):
+        print(f"{path} -> {convert_csv_to_parquet(path)}")
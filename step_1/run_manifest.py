@@ -0,0 +1,73 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, Iterable
+
+
+def atomic_write_json(path: Path, data: Dict[str, Any]):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RunManifest:
+    # Checkpoint for one grid cell (model, experiment, criteria). It records which rows are
+    # durably in the CSV, the CSV length at that point, and where the cell's scenarios start
+    # in the seeded design, so a restart replays exactly the same scenario sequence. A cell's
+    # offset depends on its position in the sweep, so a resumed cell keeps the stored offset
+    # even when this run (a subset or reordering of the sweep) would have placed it elsewhere.
+    def __init__(self, csv_path: str, cell: Dict[str, Any], scenario_seed: int, scenario_offset: int,
+                 num_responses: int):
+        self.csv_path = Path(csv_path)
+        self.path = Path(f"{csv_path}.manifest.json")
+        self.data = {
+            "cell": cell,
+            "scenario_seed": scenario_seed,
+            "scenario_offset": scenario_offset,
+            "num_responses": num_responses,
+            "completed": [],
+            "csv_bytes": 0,
+        }
+        if self.path.exists():
+            self.resume()
+        elif self.csv_path.is_file():
+            # A CSV from a run without a manifest: keep it and append, as runs used to.
+            print(f"Warning: {self.csv_path} has no manifest; appending without resume information.")
+            self.data["csv_bytes"] = self.csv_path.stat().st_size
+            atomic_write_json(self.path, self.data)
+
+    def resume(self):
+        saved = json.loads(self.path.read_text(encoding="utf-8"))
+        for key in ("cell", "scenario_seed", "num_responses"):
+            if saved[key] != self.data[key]:
+                raise ValueError(f"Cannot resume {self.csv_path}: manifest {key} is {saved[key]!r}, "
+                                 f"this run has {self.data[key]!r}")
+        if saved["scenario_offset"] != self.data["scenario_offset"]:
+            print(f"Resuming {self.csv_path} at its stored scenario offset {saved['scenario_offset']} "
+                  f"(this run would start it at {self.data['scenario_offset']})")
+        self.data = saved
+        # Anything past the last committed byte is a partially written flush from the crash.
+        # Parquet datasets are directories whose uncommitted parts are never renamed into place.
+        if self.csv_path.is_file() and self.csv_path.stat().st_size > saved["csv_bytes"]:
+            with open(self.csv_path, "r+b") as f:
+                f.truncate(saved["csv_bytes"])
+        print(f"Resuming {self.csv_path}: {len(saved['completed'])}/{saved['num_responses']} rows done")
+
+    @property
+    def scenario_offset(self) -> int:
+        return self.data["scenario_offset"]
+
+    @property
+    def completed(self) -> set:
+        return set(self.data["completed"])
+
+    def is_complete(self) -> bool:
+        return len(self.data["completed"]) >= self.data["num_responses"]
+
+    def commit(self, indices: Iterable[int], csv_bytes: int):
+        self.data["completed"] = sorted(self.completed.union(indices))
+        self.data["csv_bytes"] = csv_bytes
+        atomic_write_json(self.path, self.data)
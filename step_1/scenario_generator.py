@@ -0,0 +1,138 @@
+import math
+import re
+from typing import List, Dict, Any, Iterator, Tuple
+
+import numpy as np
+
+from prompt_text import PROMPT_TEMPLATES, SYSTEM_PROMPTS, SCENARIO_TEMPLATE
+
+SEED = 42
+FARM_TYPES = ["Paddy Rice"]
+RAINFALL_STATES = ["No Rain", "Dew", "Light Rain", "Heavy Rain"]
+SUNSHINE_INTENSITIES = ["Low", "Moderate", "High"]
+
+# (field, offset, scale, integer) for each of the 12 Sobol dimensions, in dimension order.
+SENSOR_FIELDS = [
+    ("soil_nitrogen", 0, 2000, False),
+    ("soil_potassium", 0, 2000, False),
+    ("soil_phosphorous", 0, 2000, False),
+    ("soil_ec", 0, 10000, False),
+    ("ph", 0, 14, False),
+    ("soil_temperature", 10, 30, False),
+    ("soil_moisture", 20, 60, False),
+    ("ambient_temperature", 10, 30, False),
+    ("atmospheric_humidity", 0, 100, False),
+    ("days_since_planting", 1, 199, True),
+    ("summary_hours", 1, 999, True),
+    ("water_level", 5, 25, False),
+]
+CHOICE_FIELDS = [
+    ("farm_type", FARM_TYPES),
+    ("rainfall_state", RAINFALL_STATES),
+    ("sunshine_intensity", SUNSHINE_INTENSITIES),
+]
+# Template placeholder -> scenario field, in the column order of the result CSVs.
+PROMPT_FIELDS = [
+    ("farm_type", "farm_type"),
+    ("days_since_planting", "days_since_planting"),
+    ("ph", "ph"),
+    ("soil_temperatute", "soil_temperature"),
+    ("soil_moisture", "soil_moisture"),
+    ("soil_nitrogen", "soil_nitrogen"),
+    ("soil_potassium", "soil_potassium"),
+    ("soil_phosphorous", "soil_phosphorous"),
+    ("soil_ec", "soil_ec"),
+    ("ambient_temperature", "ambient_temperature"),
+    ("atmospheric_humidity", "atmospheric_humidity"),
+    ("rainfall_state", "rainfall_state"),
+    ("sunshine_intensity", "sunshine_intensity"),
+]
+
+PLACEHOLDER = re.compile(r"%%(\w+)%%")
+SCENARIO_DTYPE = np.dtype(
+    [(name, np.int32 if integer else np.float64) for name, _, _, integer in SENSOR_FIELDS]
+    + [(name, np.uint8) for name, _ in CHOICE_FIELDS]
+)
+
+
+def compile_template(template: str):
+    # Turns %%key%% placeholders into str.format fields once, so rendering is a single
+    # C-level format_map call instead of one str.replace pass per placeholder.
+    escaped = template.replace("{", "{{").replace("}", "}}")
+    return PLACEHOLDER.sub(lambda m: "{" + m.group(1) + "}", escaped).format_map
+
+
+COMPILED_TEMPLATES = {experiment: compile_template(template) for experiment, template in PROMPT_TEMPLATES.items()}
+COMPILED_SCENARIO_TEMPLATE = compile_template(SCENARIO_TEMPLATE)
+# "inline" renders the original single user prompt; "prefix" renders only the scenario data,
+# to be sent after the experiment's fixed system prompt (see system_prompt()).
+PROMPT_LAYOUTS = ["inline", "prefix"]
+
+
+def draw_sobol_design(size: int, seed: int = SEED) -> np.ndarray:
+    # Scipy's balance guarantees hold for power-of-two sample sizes, so the whole design is
+    # drawn at the next power of two; any prefix equals sequential Sobol.random() draws.
+    from scipy.stats.qmc import Sobol  # scipy.stats is slow to import; saved designs never need it
+
+    m = max(0, math.ceil(math.log2(max(size, 1))))
+    return Sobol(d=len(SENSOR_FIELDS), scramble=True, seed=seed).random_base2(m)
+
+
+def scale_design(design: np.ndarray, choice_draws: np.ndarray) -> np.ndarray:
+    scenarios = np.empty(len(design), dtype=SCENARIO_DTYPE)
+    for column, (name, offset, scale, integer) in enumerate(SENSOR_FIELDS):
+        values = offset + design[:, column] * scale
+        scenarios[name] = np.floor(values) if integer else np.round(values, 2)
+    for column, (name, options) in enumerate(CHOICE_FIELDS):
+        scenarios[name] = np.floor(choice_draws[:, column] * len(options))
+    return scenarios
+
+
+class ScenarioGenerator:
+    def __init__(self, size: int, seed: int = SEED, scenarios: np.ndarray = None):
+        if scenarios is None:
+            design = draw_sobol_design(size, seed)
+            choice_draws = np.random.default_rng(seed).random((len(design), len(CHOICE_FIELDS)))
+            scenarios = scale_design(design, choice_draws)
+        self.scenarios = scenarios
+        self.seed = seed
+
+    def __len__(self) -> int:
+        return len(self.scenarios)
+
+    def save(self, path: str):
+        np.save(path, self.scenarios, allow_pickle=False)
+
+    @classmethod
+    def load(cls, path: str) -> "ScenarioGenerator":
+        return cls(0, scenarios=np.load(path, allow_pickle=False))
+
+    def replacements(self, start: int = 0, stop: int = None) -> Iterator[Dict[str, Any]]:
+        block = self.scenarios[start:stop]
+        columns = {}
+        for name, _, _, _ in SENSOR_FIELDS:
+            columns[name] = block[name].tolist()
+        for name, options in CHOICE_FIELDS:
+            columns[name] = [options[idx] for idx in block[name].tolist()]
+        fields = [(key, columns[field]) for key, field in PROMPT_FIELDS]
+        for row in range(len(block)):
+            yield {key: values[row] for key, values in fields}
+
+    def prompts(self, experiment: int, start: int = 0, stop: int = None,
+                layout: str = "inline") -> Iterator[Tuple[str, Dict[str, Any]]]:
+        render = COMPILED_TEMPLATES[experiment] if layout == "inline" else COMPILED_SCENARIO_TEMPLATE
+        for replacements in self.replacements(start, stop):
+            yield render(replacements), replacements
+
+
+def system_prompt(experiment: int, layout: str = "inline") -> str:
+    return SYSTEM_PROMPTS[experiment] if layout == "prefix" else None
+
+
+def take(generator: ScenarioGenerator, experiment: int, start: int, count: int,
+         layout: str = "inline") -> List[Tuple[str, Dict[str, Any]]]:
+    if layout not in PROMPT_LAYOUTS:
+        raise ValueError(f"Unknown prompt layout {layout!r}, expected one of {PROMPT_LAYOUTS}")
+    if start + count > len(generator):
+        raise ValueError(f"Scenario design has {len(generator)} rows, {start + count} requested")
+    return list(generator.prompts(experiment, start, start + count, layout))
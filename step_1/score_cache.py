@@ -0,0 +1,159 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import List, Dict, Any
+
+SCORE_CACHE_PATH = "data/taaj_score_cache.sqlite"
+SCORE_CACHE_MAX_ENTRIES = 1_000_000
+FINGERPRINT_FILES = ["config.json", "model.safetensors", "pytorch_model.bin", "tokenizer.json", "vocab.txt",
+                     "bundle.json", "bundle.safetensors"]
+HASH_BLOCK_SIZE = 1 << 20
+SQLITE_TIMEOUT = 30.0
+EVICT_RECOUNT_ROWS = 10_000
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ScoreCache:
+    # Content-addressed store of judge outputs. A key is the hash of the model fingerprint
+    # and the normalized text, so retrained weights or a new tokenizer never hit stale scores.
+    def __init__(self, path: str = SCORE_CACHE_PATH, max_entries: int = SCORE_CACHE_MAX_ENTRIES):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connect()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "key TEXT PRIMARY KEY, prediction INTEGER, probabilities TEXT, last_access REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scores_last_access ON scores (last_access)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_digests ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)"
+        )
+        self.conn.commit()
+
+    def connect(self):
+        # Also called in forked worker processes: an SQLite connection must not cross a fork.
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=SQLITE_TIMEOUT)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.entries = None
+        self.entries_since_count = 0
+
+    def cached_file_digest(self, path: Path) -> str:
+        # Hashing a 250 MB checkpoint takes seconds on a Pi, so digests are remembered per
+        # (path, size, mtime) and only recomputed when the file changes.
+        stat = path.stat()
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns, digest FROM file_digests WHERE path = ?",
+                                    (str(path),)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = file_digest(path)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO file_digests VALUES (?, ?, ?, ?)",
+                              (str(path), stat.st_size, stat.st_mtime_ns, digest))
+            self.conn.commit()
+        return digest
+
+    def fingerprint(self, model_path, tokenizer_path, backend: str = "fp32", extra_files: List = ()) -> str:
+        # extra_files are artifacts kept outside the model directory that also decide the
+        # scores, such as the ONNX export the onnx backend actually runs.
+        digest = hashlib.sha256(backend.encode())
+        for directory in (Path(model_path), Path(tokenizer_path)):
+            for name in FINGERPRINT_FILES:
+                if (directory / name).exists():
+                    digest.update(name.encode())
+                    digest.update(self.cached_file_digest((directory / name).resolve()).encode())
+        for path in map(Path, extra_files):
+            digest.update(path.name.encode())
+            digest.update(self.cached_file_digest(path.resolve()).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(fingerprint: str, text: str) -> str:
+        return hashlib.sha256(f"{fingerprint}\0{normalize_text(text)}".encode()).hexdigest()
+
+    def get_many(self, fingerprint: str, texts: List[str]) -> Dict[int, Dict[str, Any]]:
+        keys = [self.key(fingerprint, text) for text in texts]
+        found = {}
+        with self.lock:
+            # Bounded chunks stay under SQLite's host-parameter limit.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, prediction, probabilities FROM scores WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update({key: (prediction, probabilities) for key, prediction, probabilities in rows})
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE scores SET last_access = ? WHERE key = ?",
+                                      [(now, key) for key in found])
+                self.conn.commit()
+
+        results = {}
+        for idx, key in enumerate(keys):
+            if key in found:
+                prediction, probabilities = found[key]
+                results[idx] = {"prediction": prediction, "probabilities": json.loads(probabilities),
+                                "response_time": 0.0, "cached": True}
+        self.hits += len(results)
+        self.misses += len(keys) - len(results)
+        return results
+
+    def put_many(self, fingerprint: str, texts: List[str], results: List[Dict[str, Any]]):
+        now = time.time()
+        rows = [(self.key(fingerprint, text), result["prediction"], json.dumps(result["probabilities"]), now)
+                for text, result in zip(texts, results)]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)", rows)
+            self.entries_since_count += len(rows)
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        # COUNT(*) scans the table, so it runs only once the rows inserted since the last count
+        # (an upper bound, as replaced keys count too) could push the table over max_entries,
+        # or every EVICT_RECOUNT_ROWS inserts to pick up rows other worker processes added.
+        if (self.entries is not None and self.entries + self.entries_since_count <= self.max_entries
+                and self.entries_since_count < EVICT_RECOUNT_ROWS):
+            return
+        count = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            count = self.max_entries
+        self.entries = count
+        self.entries_since_count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {"entries": entries, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
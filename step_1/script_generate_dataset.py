@@ -1,31 +1,47 @@
-import csv
 import time
-import random
+
+START_TIME = time.perf_counter()  # cold-start reference, taken before any other import
+
+import argparse
+import asyncio
+import os
 import datetime
-import subprocess
-import re
-from pathlib import Path
-from typing import List, Dict, Any
-from prompt_text import PROMPT_TEMPLATES
 from pathlib import Path
+from typing import List, Dict, Any, TYPE_CHECKING
 
-import numpy as np
-from scipy.stats.qmc import Sobol
-from ollama import Client
+from score_cache import ScoreCache
+from run_manifest import RunManifest
+from ollama_models import OllamaModelManager
+from result_sink import BackgroundSink, open_result_sink, existing_columns, rotate_results, RESULT_FORMATS
+from scenario_generator import ScenarioGenerator, take, system_prompt, PROMPT_LAYOUTS, SEED
+from generation_pipeline import run_generation_pipeline, chat_messages, GENERATION_CONCURRENCY, KEEP_ALIVE
+from streaming_judge import (generate_with_early_stop, EarlyStopStats, CHECK_EVERY_TOKENS, EARLY_STOP_CONFIDENCE,
+                             MAX_ATTEMPTS)
+from grid_scheduler import GridScheduler, plan_grid, GRID_MAX_MODELS
+from taaj_instrumentation import peak_rss_mb
 
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+if TYPE_CHECKING:
+    from taaj_jury import Jury
+
+# torch, transformers, scipy and ollama take seconds to import on a Raspberry Pi. They are
+# imported where they are used, so the generation path without a judge starts right away.
+IMPORT_SECONDS = time.perf_counter() - START_TIME
+IMPORT_RSS_MB = peak_rss_mb()
 
 # Configuration
 NUM_RESPONSES = 5
 CSV_WRITE_INTERVAL = 2
-SEED = 42
-FARM_TYPES = ["Paddy Rice"]
-RAINFALL_STATES = ["No Rain", "Dew", "Light Rain", "Heavy Rain"]
-SUNSHINE_INTENSITIES = ["Low", "Moderate", "High"]
+RESULT_FORMAT = "csv"  # "csv" or "parquet" (typed columns, needs pyarrow)
+PROMPT_LAYOUT = "inline"  # "inline" or "prefix" (static system prompt, scenario data last)
 
 DATA_DIR = "data"
 taaj_model_dir = "../trained_taaj_models"
+MODEL_NAMES = ["falcon:7b", "phi3:3.8b", "tinydolphin", "llama3.2", "mistral", "openchat:7b", "vicuna:7b"]
+EXPERIMENTS = [1, 2, 3, 4]
+CRITERIA_MODELS = [0, 1, 2, 6]
+CHECK_EVERY_SENTENCES = None  # also check the partial response every N sentences
+EARLY_STOP_COLUMNS = ["total_duration_sec", "attempts", "aborted_tokens", "aborted_sec", "saved_tokens_est",
+                      "saved_sec_est"]
 
 
 evaluation_criteria_cols = [
@@ -35,179 +51,352 @@ evaluation_criteria_cols = [
 ]
 
 # Initialize
-client = Client()
-sobol = Sobol(d=12, scramble=True, seed=SEED)
-
-def predict_taaj(text: str, taaj_model, taaj_tokenizer, taaj_device) -> Dict[str, Any]:
-    inputs = taaj_tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    inputs = {k: v.to(taaj_device) for k, v in inputs.items()}
-    start_time = time.time()
-    with torch.no_grad():
-        outputs = taaj_model(**inputs)
-    duration = time.time() - start_time
-    logits = outputs.logits
-    prediction = torch.argmax(logits, dim=-1).item()
-    return {
-        "prediction": prediction,
-        "response_time": round(duration, 2)
-    }
+client = None  # the Ollama client is created on first use, see get_client()
+scenario_generator = None
+scenario_cursor = 0
 
-def scale_sobol_vector(vector: List[float]) -> Dict[str, Any]:
+def get_client():
+    global client
+    if client is None:
+        from ollama import Client
+
+        client = Client()
+    return client
+
+def next_scenarios(experiment: int, count: int, offset: int = None):
+    # Cells draw consecutive rows of one seeded design, like the single shared Sobol engine
+    # this replaces. Growing the design keeps the rows already handed out as an exact prefix.
+    # An explicit offset (used by the grid scheduler) reads rows without moving the cursor.
+    global scenario_generator, scenario_cursor
+    start = scenario_cursor if offset is None else offset
+    if scenario_generator is None or start + count > len(scenario_generator):
+        scenario_generator = ScenarioGenerator(start + count, SEED)
+    scenarios = take(scenario_generator, experiment, start, count, PROMPT_LAYOUT)
+    if offset is None:
+        scenario_cursor += count
+    return start, scenarios
+
+def taaj_columns(jury: "Jury", verdict: Dict[str, Any]) -> Dict[str, Any]:
+    if not jury:
+        return {"taaj_prediction": "", "taaj_response_time_sec": ""}
+    columns = {}
+    for criterion in jury.criteria:
+        columns[f"taaj_{criterion}_prediction"] = verdict[criterion]["prediction"]
+        columns[f"taaj_{criterion}_response_time_sec"] = round(verdict[criterion]["response_time"], 6)
+    return columns
+
+def make_result_row(i: int, prompt: str, pcp_values: Dict[str, Any], response, duration: float,
+                    jury: "Jury" = None, verdict: Dict[str, Any] = None, system: str = None) -> Dict[str, Any]:
+    # prompt_eval_count counts only the prompt tokens Ollama had to evaluate, so with the
+    # prefix layout it drops once the system prompt is cached.
+    prompt_eval_duration = response.get("prompt_eval_duration")
     return {
-        "soil_nitrogen": round(vector[0] * 2000, 2),
-        "soil_potassium": round(vector[1] * 2000, 2),
-        "soil_phosphorous": round(vector[2] * 2000, 2),
-        "soil_ec": round(vector[3] * 10000, 2),
-        "ph": round(vector[4] * 14, 2),
-        "soil_temperature": round(10 + vector[5] * 30, 2),
-        "soil_moisture": round(20 + vector[6] * 60, 2),
-        "ambient_temperature": round(10 + vector[7] * 30, 2),
-        "atmospheric_humidity": round(vector[8] * 100, 2),
-        "days_since_planting": int(1 + vector[9] * 199),
-        "summary_hours": int(1 + vector[10] * 999),
-        "water_level": round(5 + vector[11] * 25, 2),
+        "#": str(1 + i),
+        "prompt": f"{system}\n\n{prompt}" if system else prompt,
+        "response": response['message']['content'],
+        "duration_sec": round(duration, 2),
+        "token_count": response.get("eval_count", "N/A"),
+        "prompt_eval_count": response.get("prompt_eval_count") or "N/A",
+        "prompt_eval_sec": round(prompt_eval_duration / 1e9, 4) if prompt_eval_duration else "N/A",
+        **taaj_columns(jury, verdict),
+        **dict(pcp_values),
     }
 
-def random_choice(seq):
-    return random.choice(seq)
-
-def make_prompt(pcp: Dict[str, Any], experiment: int) -> str:
-    replacements = {
-        "farm_type": random_choice(FARM_TYPES),
-        "days_since_planting": pcp["days_since_planting"],
-        "ph": pcp["ph"],
-        "soil_temperatute": pcp["soil_temperature"],
-        "soil_moisture": pcp["soil_moisture"],
-        "soil_nitrogen": pcp["soil_nitrogen"],
-        "soil_potassium": pcp["soil_potassium"],
-        "soil_phosphorous": pcp["soil_phosphorous"],
-        "soil_ec": pcp["soil_ec"],
-        "ambient_temperature": pcp["ambient_temperature"],
-        "atmospheric_humidity": pcp["atmospheric_humidity"],
-        "rainfall_state": random_choice(RAINFALL_STATES),
-        "sunshine_intensity": random_choice(SUNSHINE_INTENSITIES)
-    }
-    prompt = PROMPT_TEMPLATES[experiment]
-    for key, val in replacements.items():
-        prompt = prompt.replace(f"%%{key}%%", str(val))
-    return prompt, replacements
-
-def write_to_csv(file_path: str, rows: List[Dict[str, Any]], header_written: bool = False):
-    with open(file_path, mode='a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-        if not header_written and f.tell() == 0:
-            writer.writeheader()
-        writer.writerows(rows)
-
-def run_command(command):
-    try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command: {e.stderr.strip()}")
-        return None
-
-def parse_model_list(output):
-    models = []
-    lines = output.splitlines()
-    for line in lines:
-        match = re.match(r"^\s*([\w\-]+:[\w\-]+)", line)
-        if match:
-            models.append(match.group(1))
-    return models
-
-def uninstall_all_ollama_models(model_names):
-    print("Fetching installed Ollama models...")
-    for model_name in model_names:
-        print(f"Uninstalling model: {model_name}")
-        uninstall_command = f"ollama rm {model_name}"
-        run_command(uninstall_command)
-        print(f"Model {model_name} uninstalled.")
-
-def install_ollama_model(model_name):
-    print(f"Installing Ollama model: {model_name}")
-    install_command = f"ollama pull {model_name}"
-    run_command(install_command)
-    print(f"Model {model_name} installed.")
-
-def run_experiment(model_name: str, experiment: int, taaj_model=None, taaj_tokenizer=None, taaj_device=None, criteria_model=None):
-    CSV_FILE_PATH = f"{DATA_DIR}/cry{criteria_model}_exp{experiment}-responses-{model_name}-{NUM_RESPONSES}.csv"
+def result_columns(pcp_values: Dict[str, Any], jury: "Jury" = None, early_stop: bool = False) -> List[str]:
+    # The columns make_result_row (plus the early-stop fields) will write for this cell.
+    verdict = {criterion: {"prediction": 0, "response_time": 0.0} for criterion in jury.criteria} if jury else None
+    row = make_result_row(0, "", pcp_values, {"message": {"content": ""}}, 0.0, jury, verdict)
+    return list(row) + (EARLY_STOP_COLUMNS if early_stop else [])
+
+def experiment_result_path(model_name: str, experiment: int, criteria_model=None) -> str:
+    layout = "" if PROMPT_LAYOUT == "inline" else f"-{PROMPT_LAYOUT}"
+    return f"{DATA_DIR}/cry{criteria_model}_exp{experiment}-responses-{model_name}-{NUM_RESPONSES}{layout}.{RESULT_FORMAT}"
+
+def print_run_header(model_name: str, experiment: int, result_path: str):
     print(f"Starting data generation at {datetime.datetime.now()}")
     print(f"Experiment number: {experiment}")
     print(f"Using model: {model_name}")
     print(f"Number of responses to generate: {NUM_RESPONSES}")
-    print(f"CSV file path: {CSV_FILE_PATH}")
-    header_written = Path(CSV_FILE_PATH).exists()
-    results = []
-
-    for i in range(NUM_RESPONSES):
-        pcp = scale_sobol_vector(sobol.random()[0])
-        prompt, pcp_values = make_prompt(pcp, experiment)
-
-        print(f"Generating response {i + 1}/{NUM_RESPONSES}...")
-        start_time = time.time()
-        response = client.chat(model=model_name, messages=[{"role": "user", "content": prompt}])
-        # response = {"message": {"content": f"Mock response for {prompt}"}}
-        duration = time.time() - start_time
-
-        if taaj_model and taaj_tokenizer and taaj_device:
-            taaj_result = predict_taaj(response['message']['content'], taaj_model, taaj_tokenizer, taaj_device)
-        else:
-            taaj_result = {"prediction": "", "response_time": ""}
-
-        result = {
-            "#": str(1 + i),
-            "prompt": prompt,
-            "response": response['message']['content'],
-            "duration_sec": round(duration, 2),
-            "token_count": response.get("eval_count", "N/A"),
-            "taaj_prediction": taaj_result["prediction"],
-            "taaj_response_time_sec": taaj_result["response_time"],
-            **dict(pcp_values),
-        }
-
-        results.append(result)
-
-        if (i + 1) % CSV_WRITE_INTERVAL == 0:
-            write_to_csv(CSV_FILE_PATH, results, header_written)
-            header_written = True
-            results.clear()
-
-    if results:
-        write_to_csv(CSV_FILE_PATH, results, header_written)
+    print(f"Result file path: {result_path}")
+
+def start_cell(model_name: str, experiment: int, criteria_model=None, scenario_offset: int = None,
+               jury: "Jury" = None, early_stop: bool = False):
+    RESULT_PATH = experiment_result_path(model_name, experiment, criteria_model)
+    print_run_header(model_name, experiment, RESULT_PATH)
+    scenario_offset, scenarios = next_scenarios(experiment, NUM_RESPONSES, scenario_offset)
+    # Results from an older version of this script (e.g. without prompt_eval_* or per-criterion
+    # TaaJ columns) cannot take the new rows; move them aside before generating anything.
+    existing = existing_columns(RESULT_PATH)
+    columns = result_columns(scenarios[0][1], jury, early_stop) if scenarios else []
+    if existing and columns and sorted(existing) != sorted(columns):
+        rotated = rotate_results(RESULT_PATH)
+        print(f"Warning: {RESULT_PATH} has other columns than this run writes; moved it to {rotated} "
+              f"and starting the cell over.")
+    cell = {"model": model_name, "experiment": experiment, "criteria": criteria_model}
+    manifest = RunManifest(RESULT_PATH, cell, SEED, scenario_offset, NUM_RESPONSES)
+    if manifest.scenario_offset != scenario_offset:
+        _, scenarios = next_scenarios(experiment, NUM_RESPONSES, manifest.scenario_offset)
+    return RESULT_PATH, manifest, scenarios
+
+def open_cell_sink(result_path: str, manifest: RunManifest) -> BackgroundSink:
+    # Rows count as done only once the sink reports them durable and the manifest records
+    # the new CSV length; a crash in between leaves bytes that the next resume truncates.
+    def on_commit(row_numbers, csv_bytes):
+        manifest.commit([int(n) - 1 for n in row_numbers], csv_bytes)
+
+    return BackgroundSink(open_result_sink(result_path, RESULT_FORMAT), on_commit, CSV_WRITE_INTERVAL)
+
+def run_experiment(model_name: str, experiment: int, jury: "Jury" = None, criteria_model=None,
+                   thresholds: Dict[str, int] = None, scenario_offset: int = None):
+    early_stop = bool(jury and thresholds)
+    RESULT_PATH, manifest, scenarios = start_cell(model_name, experiment, criteria_model, scenario_offset, jury,
+                                                  early_stop)
+    if manifest.is_complete():
+        print(f"All {NUM_RESPONSES} responses already generated, skipping.")
+        return
+    completed = manifest.completed
+    sink = open_cell_sink(RESULT_PATH, manifest)
+    early_stop_stats = EarlyStopStats()
+    system = system_prompt(experiment, PROMPT_LAYOUT)
+
+    # The sink is closed even when generation or judging fails, so rows already produced
+    # are written and committed instead of being regenerated on resume.
+    try:
+        for i, (prompt, pcp_values) in enumerate(scenarios):
+            if i in completed:
+                continue
+
+            print(f"Generating response {i + 1}/{NUM_RESPONSES}...")
+            if early_stop:
+                generation = generate_with_early_stop(get_client(), model_name, prompt, jury, thresholds,
+                                                      early_stop_stats, MAX_ATTEMPTS, CHECK_EVERY_TOKENS,
+                                                      CHECK_EVERY_SENTENCES, confidence=EARLY_STOP_CONFIDENCE,
+                                                      system=system, keep_alive=KEEP_ALIVE)
+                row = make_result_row(i, prompt, pcp_values, generation["response"],
+                                      generation["generation_duration"], jury, generation["verdict"], system)
+                row.update(dict(zip(EARLY_STOP_COLUMNS, (
+                    round(generation["duration"], 2),
+                    generation["attempts"],
+                    generation["aborted_tokens"],
+                    round(generation["aborted_seconds"], 2),
+                    round(generation["saved_tokens"], 1),
+                    round(generation["saved_seconds"], 2),
+                ))))
+                sink.submit(row)
+            else:
+                start_time = time.time()
+                response = get_client().chat(model=model_name, messages=chat_messages(prompt, system),
+                                             keep_alive=KEEP_ALIVE)
+                # Offline: run mock_ollama_server.py and set OLLAMA_HOST to replay recorded responses.
+                duration = time.time() - start_time
+
+                verdict = jury.evaluate([response['message']['content']])[0] if jury else None
+                sink.submit(make_result_row(i, prompt, pcp_values, response, duration, jury, verdict, system))
+    finally:
+        sink.close()
+    if early_stop_stats.aborted:
+        print(f"Early stopping summary: {early_stop_stats.summary()}")
+
+async def run_experiment_async(model_name: str, experiment: int, jury: "Jury" = None, criteria_model=None,
+                               concurrency: int = GENERATION_CONCURRENCY, scenario_offset: int = None):
+    # Same rows as run_experiment, but up to `concurrency` generations are in flight while
+    # finished responses are judged. Ollama only serves them in parallel when started with
+    # OLLAMA_NUM_PARALLEL >= concurrency.
+    RESULT_PATH, manifest, scenarios = start_cell(model_name, experiment, criteria_model, scenario_offset, jury)
+    if manifest.is_complete():
+        print(f"All {NUM_RESPONSES} responses already generated, skipping.")
+        return
+    completed = manifest.completed
+    pending = [i for i in range(len(scenarios)) if i not in completed]
+    sink = open_cell_sink(RESULT_PATH, manifest)
+    system = system_prompt(experiment, PROMPT_LAYOUT)
+
+    def on_result(j, response, duration, verdict):
+        i = pending[j]
+        prompt, pcp_values = scenarios[i]
+        print(f"Completed response {i + 1}/{NUM_RESPONSES}")
+        sink.submit(make_result_row(i, prompt, pcp_values, response, duration, jury, verdict, system))
+
+    from ollama import AsyncClient
+
+    try:
+        await run_generation_pipeline(AsyncClient(), model_name, [scenarios[i][0] for i in pending], jury,
+                                      on_result, concurrency, system=system, keep_alive=KEEP_ALIVE)
+    finally:
+        sink.close()
+
+def run_experiment_cell(model_name: str, experiment: int, jury: "Jury" = None, criteria_model=None,
+                        concurrency: int = 1, thresholds: Dict[str, int] = None, scenario_offset: int = None):
+    # Streaming early-stop regeneration runs one generation at a time.
+    if concurrency > 1 and not thresholds:
+        asyncio.run(run_experiment_async(model_name, experiment, jury, criteria_model, concurrency,
+                                         scenario_offset))
+    else:
+        run_experiment(model_name, experiment, jury, criteria_model, thresholds, scenario_offset)
+
+def trained_criteria(model_dir: str) -> List[int]:
+    # Indices into evaluation_criteria_cols that have a fine-tuned model under model_dir
+    # (same layout as taaj_jury.taaj_model_path, without importing torch for argument parsing).
+    return [idx for idx, criterion in enumerate(evaluation_criteria_cols)
+            if Path(f"{model_dir}/fine_tuned_taaj_model_{criterion}/final_model").is_dir()]
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate Ollama responses for the experiment grid, optionally "
+                                                 "judged by the TaaJ models.")
+    parser.add_argument("--models", nargs="+", default=MODEL_NAMES, help="Ollama models to generate with")
+    parser.add_argument("--experiments", nargs="+", type=int, default=EXPERIMENTS, choices=EXPERIMENTS)
+    parser.add_argument("--criteria", nargs="+", type=int, default=CRITERIA_MODELS,
+                        choices=range(len(evaluation_criteria_cols)),
+                        help="TaaJ criteria, as indices into evaluation_criteria_cols; with --taaj each "
+                             "needs a trained model in --taaj-model-dir (or --taaj-bundle)")
+    parser.add_argument("--taaj", action=argparse.BooleanOptionalAction, default=False,
+                        help="judge every response with the TaaJ models (typically for step 5)")
+    parser.add_argument("--taaj-backend", default="fp32", choices=["fp32", "int8", "onnx", "fp16"],
+                        help="fp32, int8 (dynamic quantization), onnx (ONNX Runtime) or fp16 (bundles only)")
+    parser.add_argument("--taaj-model-dir", default=taaj_model_dir)
+    parser.add_argument("--taaj-bundle", default=None,
+                        help="load the judges from a taaj_bundle.py bundle instead of --taaj-model-dir")
+    parser.add_argument("--taaj-window-pooling", default=None, choices=["mean", "min", "attention"],
+                        help="score responses longer than 512 tokens as overlapping windows pooled this way "
+                             "(min: the weakest window decides, e.g. for safety) instead of truncating them")
+    parser.add_argument("--score-cache", action=argparse.BooleanOptionalAction, default=True,
+                        help="reuse TaaJ scores for texts already judged by the same model weights")
+    parser.add_argument("--regenerate", nargs="+", default=[], metavar="CRITERION=SCORE",
+                        help="stream, cancel and regenerate responses scoring below SCORE, e.g. safety_score=3")
+    parser.add_argument("--check-every-tokens", type=int, default=CHECK_EVERY_TOKENS,
+                        help="with --regenerate, score the partial response every N streamed tokens (0: never)")
+    parser.add_argument("--check-every-sentences", type=int, default=CHECK_EVERY_SENTENCES,
+                        help="with --regenerate, also score it every N completed sentences")
+    parser.add_argument("--early-stop-confidence", type=float, default=EARLY_STOP_CONFIDENCE,
+                        help="cancel once P(score below threshold) reaches this")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help="generations per response before the last one is kept regardless")
+    parser.add_argument("--num-responses", type=int, default=NUM_RESPONSES)
+    parser.add_argument("--prompt-layout", default=PROMPT_LAYOUT, choices=PROMPT_LAYOUTS,
+                        help="prefix: static instructions as a fixed system prompt, scenario data last "
+                             "(lets Ollama reuse the cached prompt prefix)")
+    parser.add_argument("--keep-alive", default=KEEP_ALIVE, help="how long Ollama keeps the model loaded")
+    parser.add_argument("--result-format", default=RESULT_FORMAT, choices=RESULT_FORMATS)
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="> 1 overlaps generation and judging (needs OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="> 1 runs grid cells on forked worker processes sharing one loaded jury")
+    parser.add_argument("--priority", nargs="+", default=[], metavar="MODEL=N",
+                        help="higher priority models are scheduled first by the grid workers")
+    parser.add_argument("--max-models", type=int, default=GRID_MAX_MODELS,
+                        help="how many Ollama models the grid workers may run at the same time")
+    parser.add_argument("--disk-budget-gb", type=float, default=20,
+                        help="installed Ollama models are kept under this size, evicting LRU")
+    args = parser.parse_args(argv)
+    try:
+        args.regenerate = {k: int(v) for k, v in (item.split("=", 1) for item in args.regenerate)}
+        args.priority = {k: int(v) for k, v in (item.split("=", 1) for item in args.priority)}
+    except ValueError:
+        parser.error("--regenerate and --priority take NAME=INTEGER pairs")
+    if args.regenerate and not args.taaj:
+        parser.error("--regenerate needs the TaaJ judge (--taaj)")
+    if not 0 < args.early_stop_confidence <= 1:
+        parser.error("--early-stop-confidence must be in (0, 1]")
+    if args.max_attempts < 1 or args.check_every_tokens < 0 or (args.check_every_sentences or 0) < 0:
+        parser.error("--max-attempts must be at least 1 and the --check-every-* intervals not negative")
+    if args.taaj_backend == "fp16" and not args.taaj_bundle:
+        parser.error("--taaj-backend fp16 runs from a bundle; pass --taaj-bundle (see taaj_bundle.py)")
+    if args.taaj and not args.taaj_bundle:
+        untrained = sorted(set(args.criteria) - set(trained_criteria(args.taaj_model_dir)))
+        if untrained:
+            parser.error(f"--criteria {untrained} have no trained model in {args.taaj_model_dir}; "
+                         f"available: {trained_criteria(args.taaj_model_dir)}")
+    selected = [evaluation_criteria_cols[idx] for idx in args.criteria]
+    unknown = sorted(set(args.regenerate) - set(selected))
+    if unknown:
+        parser.error(f"--regenerate criteria {unknown} are not among the selected --criteria {selected}")
+    return args
+
+def load_scenarios(size: int) -> ScenarioGenerator:
+    # Draw every scenario of the sweep up front and keep the design for exact reruns; a rerun
+    # reads the saved design back instead of drawing it again.
+    Path(DATA_DIR).mkdir(parents=True, exist_ok=True)
+    design_path = Path(f"{DATA_DIR}/scenario_design-seed{SEED}-n{size}.npy")
+    if design_path.exists():
+        return ScenarioGenerator.load(str(design_path))
+    generator = ScenarioGenerator(size, SEED)
+    generator.save(str(design_path))
+    return generator
 
 if __name__ == "__main__":
-    use_taaj_model = False  # Set to True to run with TAAJ model (typically for step 5)
-    model_names = ["falcon:7b", "phi3:3.8b", "tinydolphin", "llama3.2", "mistral", "openchat:7b", "vicuna:7b"]
-    experiments = [1, 2, 3, 4]
-    criteria_models = [0, 1, 2, 6]
-
-    if use_taaj_model:
-        for model_name in model_names:
-            uninstall_all_ollama_models(model_names)
-            install_ollama_model(model_name)
-
-            for criteria_model in criteria_models:
-                TAAJ_MODEL_NAME = f"fine_tuned_taaj_model_{evaluation_criteria_cols[criteria_model]}"
-                TAAJ_MODEL_PATH = Path(f"{taaj_model_dir}/{TAAJ_MODEL_NAME}/final_model").resolve()
-                TAAJ_TOKENIZER_PATH = Path(f"{taaj_model_dir}/{TAAJ_MODEL_NAME}/tokenizer").resolve()
-
-                print(TAAJ_MODEL_PATH)
-                print(TAAJ_TOKENIZER_PATH)
-
-                # Load TAAJ model and tokenizer
-                taaj_tokenizer = AutoTokenizer.from_pretrained(str(TAAJ_TOKENIZER_PATH), local_files_only=True)
-                taaj_model = AutoModelForSequenceClassification.from_pretrained(str(TAAJ_MODEL_PATH), local_files_only=True)
-                taaj_model.eval()
-                taaj_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-                taaj_model.to(taaj_device)
+    args = parse_args()
+    NUM_RESPONSES = args.num_responses
+    RESULT_FORMAT = args.result_format
+    PROMPT_LAYOUT = args.prompt_layout
+    KEEP_ALIVE = args.keep_alive
+    CHECK_EVERY_TOKENS = args.check_every_tokens
+    CHECK_EVERY_SENTENCES = args.check_every_sentences
+    EARLY_STOP_CONFIDENCE = args.early_stop_confidence
+    MAX_ATTEMPTS = args.max_attempts
+    model_names = args.models
+    experiments = args.experiments
+    criteria_models = args.criteria
+    regenerate_thresholds = args.regenerate
 
-                for experiment in experiments:
-                    run_experiment(model_name, experiment, taaj_model, taaj_tokenizer, taaj_device, criteria_model)
+    scenario_generator = load_scenarios(len(model_names) * len(experiments) * NUM_RESPONSES)
+    model_manager = OllamaModelManager(int(args.disk_budget_gb * 1e9))
+    jury = None
+    criteria_tag = None
+    score_cache = None
+    if args.taaj:
+        from taaj_jury import Jury
+
+        # One resident jury scores every criterion per response, instead of reloading
+        # a model per criterion and re-running each experiment once per criterion.
+        criteria = [evaluation_criteria_cols[criteria_model] for criteria_model in criteria_models]
+        score_cache = ScoreCache() if args.score_cache else None
+        jury = Jury(criteria, args.taaj_model_dir, backend=args.taaj_backend, cache=score_cache,
+                    bundle=args.taaj_bundle, window_pooling=args.taaj_window_pooling)
+        criteria_tag = "_".join(str(criteria_model) for criteria_model in criteria_models)
+    print(f"Cold start: {IMPORT_SECONDS:.2f}s imports ({IMPORT_RSS_MB:.0f} MB RSS), "
+          f"{time.perf_counter() - START_TIME:.2f}s until the first cell ({peak_rss_mb():.0f} MB peak RSS)")
+
+    if args.workers > 1:
+        def run_grid_cell(task):
+            # Cache counters live in the worker process; the scheduler sums what each cell returns.
+            hits, misses = (score_cache.hits, score_cache.misses) if score_cache else (0, 0)
+            run_experiment_cell(task["model"], task["experiment"], jury, criteria_tag, args.concurrency,
+                                regenerate_thresholds, task["offset"])
+            if score_cache:
+                return {"score_cache_hits": score_cache.hits - hits, "score_cache_misses": score_cache.misses - misses}
+
+        def init_grid_worker(worker_id):
+            # HTTP clients and SQLite connections must not be shared across fork; each worker
+            # also gets its slice of the cores for the judge.
+            global client
+            client = None
+            if score_cache:
+                score_cache.connect()
+            if jury:
+                import torch
+
+                torch.set_num_threads(max(1, (os.cpu_count() or 1) // args.workers))
+
+        scheduler = GridScheduler(run_grid_cell, args.workers, model_manager, init_grid_worker,
+                                  max_models=args.max_models)
+        failures = scheduler.run(plan_grid(model_names, experiments, NUM_RESPONSES, args.priority))
+        if score_cache:
+            score_cache.hits += scheduler.counters.get("score_cache_hits", 0)
+            score_cache.misses += scheduler.counters.get("score_cache_misses", 0)
+        if failures:
+            print(f"{len(failures)} grid cells failed; rerun to resume them.")
     else:
-        for model_name in model_names:
-            uninstall_all_ollama_models(model_names)
-            install_ollama_model(model_name)
+        for n, model_name in enumerate(model_names):
+            next_model = model_names[n + 1] if n + 1 < len(model_names) else None
+            model_manager.ensure(model_name, keep=[next_model] if next_model else [])
+            if next_model:
+                model_manager.prefetch(next_model)
+
+            with model_manager.generating(model_name):
+                for experiment in experiments:
+                    run_experiment_cell(model_name, experiment, jury, criteria_tag, args.concurrency,
+                                        regenerate_thresholds)
 
-            for experiment in experiments:
-                run_experiment(model_name, experiment)
\ No newline at end of file
+    print(f"Ollama pull vs generation time: {model_manager.report()['totals']}")
+    if score_cache:
+        print(f"TaaJ score cache: {score_cache.stats()}")
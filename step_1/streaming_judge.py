@@ -0,0 +1,161 @@
+import re
+import time
+from typing import Dict, Any
+
+from generation_pipeline import chat_messages, KEEP_ALIVE
+
+CHECK_EVERY_TOKENS = 32
+MIN_TOKENS_BEFORE_CHECK = 24
+EARLY_STOP_CONFIDENCE = 0.8
+MAX_ATTEMPTS = 3
+
+SENTENCE_END = re.compile(r"[.!?](\s|$)")
+
+
+class EarlyStopStats:
+    # Running totals across generations; completed generations give the average length and
+    # speed used to estimate what an aborted generation would have cost if run to the end.
+    def __init__(self):
+        self.completed = 0
+        self.completed_tokens = 0
+        self.completed_seconds = 0.0
+        self.aborted = 0
+        self.aborted_tokens = 0
+        self.aborted_seconds = 0.0
+        self.saved_tokens = 0.0
+        self.saved_seconds = 0.0
+
+    def record_completed(self, tokens: int, seconds: float):
+        self.completed += 1
+        self.completed_tokens += tokens
+        self.completed_seconds += seconds
+
+    def record_aborted(self, tokens: int, seconds: float) -> Dict[str, float]:
+        self.aborted += 1
+        self.aborted_tokens += tokens
+        self.aborted_seconds += seconds
+        saved_tokens, saved_seconds = 0.0, 0.0
+        if self.completed and self.completed_seconds > 0:
+            saved_tokens = max(self.completed_tokens / self.completed - tokens, 0.0)
+            saved_seconds = saved_tokens * self.completed_seconds / self.completed_tokens
+        self.saved_tokens += saved_tokens
+        self.saved_seconds += saved_seconds
+        return {"saved_tokens": saved_tokens, "saved_seconds": saved_seconds}
+
+    def summary(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+def probability_below(verdict: Dict[str, Any], threshold: int) -> float:
+    return sum(p for label, p in verdict["probabilities"].items() if int(label.split("_")[-1]) < threshold)
+
+
+def failing_criteria(jury, text: str, thresholds: Dict[str, int], confidence: float) -> Dict[str, float]:
+    # A criterion fails only when the judge is confident the score is below its threshold,
+    # so an ambiguous partial text is allowed to keep generating. Partial texts are never
+    # seen again, so they bypass the score cache.
+    verdict = jury.evaluate([text], use_cache=False)[0]
+    failing = {}
+    for criterion, threshold in thresholds.items():
+        p_below = probability_below(verdict[criterion], threshold)
+        if p_below >= confidence:
+            failing[criterion] = p_below
+    return failing
+
+
+def is_checkpoint(text: str, tokens: int, last_check_tokens: int, last_check_sentences: int,
+                  check_every_tokens: int, check_every_sentences: int):
+    sentences = len(SENTENCE_END.findall(text))
+    if check_every_sentences and sentences - last_check_sentences >= check_every_sentences:
+        return True, sentences
+    if check_every_tokens and tokens - last_check_tokens >= check_every_tokens:
+        return True, sentences
+    return False, last_check_sentences
+
+
+def stream_attempt(client, model_name: str, prompt: str, jury, thresholds: Dict[str, int], allow_abort: bool,
+                   check_every_tokens: int, check_every_sentences: int, min_tokens: int,
+                   confidence: float, system: str = None, keep_alive: str = KEEP_ALIVE) -> Dict[str, Any]:
+    stream = client.chat(model=model_name, messages=chat_messages(prompt, system), stream=True, keep_alive=keep_alive)
+    start_time = time.time()
+    pieces, tokens, final_chunk = [], 0, None
+    last_check_tokens, last_check_sentences = 0, 0
+    try:
+        for chunk in stream:
+            pieces.append(chunk["message"]["content"])
+            if chunk.get("done"):
+                # The final chunk carries the stats, not a token.
+                final_chunk = chunk
+                break
+            tokens += 1
+            if not allow_abort or tokens < min_tokens:
+                continue
+            text = "".join(pieces)
+            check, last_check_sentences = is_checkpoint(text, tokens, last_check_tokens, last_check_sentences,
+                                                        check_every_tokens, check_every_sentences)
+            if not check:
+                continue
+            last_check_tokens = tokens
+            failing = failing_criteria(jury, text, thresholds, confidence)
+            if failing:
+                return {"aborted": True, "content": text, "tokens": tokens,
+                        "duration": time.time() - start_time, "failing": failing}
+    finally:
+        # Closing the stream drops the HTTP response, which makes Ollama stop generating.
+        if hasattr(stream, "close"):
+            stream.close()
+
+    final_chunk = final_chunk or {}
+    eval_count = final_chunk.get("eval_count")
+    return {"aborted": False, "content": "".join(pieces), "tokens": eval_count or tokens,
+            "duration": time.time() - start_time, "eval_count": eval_count,
+            "prompt_eval_count": final_chunk.get("prompt_eval_count"),
+            "prompt_eval_duration": final_chunk.get("prompt_eval_duration")}
+
+
+def generate_with_early_stop(client, model_name: str, prompt: str, jury, thresholds: Dict[str, int],
+                             stats: EarlyStopStats = None, max_attempts: int = MAX_ATTEMPTS,
+                             check_every_tokens: int = CHECK_EVERY_TOKENS, check_every_sentences: int = None,
+                             min_tokens: int = MIN_TOKENS_BEFORE_CHECK,
+                             confidence: float = EARLY_STOP_CONFIDENCE, system: str = None,
+                             keep_alive: str = KEEP_ALIVE) -> Dict[str, Any]:
+    # Streams the generation and re-scores the partial text at each checkpoint; a generation
+    # that clearly fails a threshold is cancelled and regenerated. A completed generation
+    # whose final score is below threshold is also regenerated. The last attempt always
+    # runs to completion and is kept.
+    stats = stats or EarlyStopStats()
+    aborted_tokens, aborted_seconds, saved_tokens, saved_seconds = 0, 0.0, 0.0, 0.0
+    start_time = time.time()
+    for attempt in range(1, max_attempts + 1):
+        last_attempt = attempt == max_attempts
+        result = stream_attempt(client, model_name, prompt, jury, thresholds, not last_attempt,
+                                check_every_tokens, check_every_sentences, min_tokens, confidence, system,
+                                keep_alive)
+        if result["aborted"]:
+            saved = stats.record_aborted(result["tokens"], result["duration"])
+            aborted_tokens += result["tokens"]
+            aborted_seconds += result["duration"]
+            saved_tokens += saved["saved_tokens"]
+            saved_seconds += saved["saved_seconds"]
+            print(f"Attempt {attempt} cancelled after {result['tokens']} tokens: {sorted(result['failing'])}")
+            continue
+
+        stats.record_completed(result["tokens"], result["duration"])
+        verdict = jury.evaluate([result["content"]])[0]
+        below = [c for c, threshold in thresholds.items() if verdict[c]["prediction"] < threshold]
+        if below and not last_attempt:
+            print(f"Attempt {attempt} completed below threshold: {below}")
+            continue
+        return {
+            "response": {"message": {"content": result["content"]}, "eval_count": result["eval_count"],
+                         "prompt_eval_count": result["prompt_eval_count"],
+                         "prompt_eval_duration": result["prompt_eval_duration"]},
+            "verdict": verdict,
+            "generation_duration": result["duration"],
+            "duration": time.time() - start_time,
+            "attempts": attempt,
+            "aborted_tokens": aborted_tokens,
+            "aborted_seconds": aborted_seconds,
+            "saved_tokens": saved_tokens,
+            "saved_seconds": saved_seconds,
+        }
@@ -0,0 +1,195 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Dict, Any
+
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from run_manifest import atomic_write_json
+from score_cache import file_digest
+
+BACKENDS = ["fp32", "int8", "onnx"]
+ONNX_FILE_NAME = "model.onnx"
+SAFETENSORS_FILE_NAME = "model.safetensors"
+WEIGHT_FILE_NAMES = [SAFETENSORS_FILE_NAME, "pytorch_model.bin"]
+ONNX_EXPORT_DIR = "data/taaj_onnx"
+ONNX_SOURCE_SUFFIX = ".source.json"
+ONNX_OPSET = 17
+
+
+class OnnxTaajModel:
+    # Mirrors the slice of the HF model interface the jury uses: model(**inputs).logits
+    def __init__(self, onnx_path: Path, num_threads: int = 0):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, input_ids, attention_mask):
+        logits = self.session.run(["logits"], {
+            "input_ids": input_ids.cpu().numpy(),
+            "attention_mask": attention_mask.cpu().numpy(),
+        })[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        return self
+
+
+def export_onnx(model, onnx_path: Path) -> Path:
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    torch.onnx.export(
+        model,
+        (dummy, dummy),
+        str(onnx_path),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=ONNX_OPSET,
+        dynamo=False,
+    )
+    return onnx_path
+
+
+def onnx_export_path(model_path) -> Path:
+    # Exports live under data/, not next to the git-tracked checkpoint; the directory name
+    # keeps the criterion readable and the path hash keeps model directories apart.
+    model_path = Path(model_path).resolve()
+    path_key = hashlib.sha256(str(model_path).encode()).hexdigest()[:12]
+    return Path(ONNX_EXPORT_DIR) / f"{model_path.parent.name}-{path_key}" / ONNX_FILE_NAME
+
+
+def weights_source(model_path: Path, previous: Dict[str, Any]) -> Dict[str, Any]:
+    # Identifies the checkpoint an export was made from. Hashing the weights takes seconds on
+    # a Pi, so the previous digest is reused while the file's size and mtime are unchanged.
+    weights = next((model_path / name for name in WEIGHT_FILE_NAMES if (model_path / name).exists()), None)
+    if weights is None:
+        raise FileNotFoundError(f"{model_path} has none of {WEIGHT_FILE_NAMES}")
+    stat = weights.stat()
+    source = {"weights": str(weights.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if all(previous.get(key) == value for key, value in source.items()) and previous.get("sha256"):
+        return {**source, "sha256": previous["sha256"]}
+    return {**source, "sha256": file_digest(weights)}
+
+
+def ensure_onnx_export(model_path: Path) -> Path:
+    # Re-exports whenever the weights digest differs from the one recorded in the sidecar
+    # written next to the export, so retrained weights never run through a stale graph.
+    onnx_path = onnx_export_path(model_path)
+    sidecar = onnx_path.with_name(onnx_path.name + ONNX_SOURCE_SUFFIX)
+    previous = json.loads(sidecar.read_text()) if sidecar.exists() and onnx_path.exists() else {}
+    source = weights_source(model_path, previous)
+    if source["sha256"] != previous.get("sha256"):
+        print(f"Exporting {model_path} to ONNX: {onnx_path}")
+        onnx_path.parent.mkdir(parents=True, exist_ok=True)
+        model = load_pretrained(model_path)
+        model.config.return_dict = False
+        tmp_path = onnx_path.with_name(onnx_path.name + ".inprogress")
+        export_onnx(model, tmp_path)
+        os.replace(tmp_path, onnx_path)
+    if source != previous:
+        atomic_write_json(sidecar, source)
+    return onnx_path
+
+
+def load_pretrained(model_path: Path):
+    # Safetensors checkpoints are memory-mapped, so fp32 weights stay backed by the page cache
+    # (shared with every other process judging with the same file) instead of read into RAM.
+    if not (model_path / SAFETENSORS_FILE_NAME).exists():
+        print(f"Warning: {model_path} has no {SAFETENSORS_FILE_NAME}, its weights are read into memory; "
+              f"re-save it with save_pretrained(..., safe_serialization=True)")
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_path), local_files_only=True)
+    model.eval()
+    return model
+
+
+def load_taaj_backend(model_path, backend: str = "fp32", device=None, num_threads: int = 0):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown TaaJ backend {backend!r}, expected one of {BACKENDS}")
+    model_path = Path(model_path)
+
+    if backend == "onnx":
+        return OnnxTaajModel(ensure_onnx_export(model_path), num_threads)
+
+    model = load_pretrained(model_path)
+    if backend == "int8":
+        # Dynamic quantization only has CPU kernels, so the int8 judge always runs on CPU.
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model.to(device or torch.device("cpu"))
+
+
+def parity_report(model_path, tokenizer, texts: List[str], backends: List[str] = BACKENDS,
+                  labels: List[int] = None) -> Dict[str, Any]:
+    # Texts are scored one at a time so latency reflects the per-response cost on device.
+    # fp32 always runs first and is the reference every other backend is compared with.
+    report = {}
+    reference = None
+    for backend in ["fp32"] + [b for b in backends if b != "fp32"]:
+        model = load_taaj_backend(model_path, backend)
+        predictions, probabilities, latencies = [], [], []
+        for text in texts:
+            inputs = tokenizer(text, return_tensors="pt", truncation=True)
+            start_time = time.perf_counter()
+            with torch.no_grad():
+                logits = model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).logits
+            latencies.append(time.perf_counter() - start_time)
+            probs = torch.softmax(logits.float(), dim=-1)[0]
+            probabilities.append(probs)
+            predictions.append(int(torch.argmax(probs)))
+        if reference is None:
+            reference = {"predictions": predictions, "probabilities": probabilities}
+
+        entry = {
+            "latency_mean_sec": statistics.mean(latencies),
+            "latency_p50_sec": statistics.median(latencies),
+            "agreement_with_fp32": sum(
+                p == r for p, r in zip(predictions, reference["predictions"])) / len(texts),
+            "max_prob_diff_vs_fp32": max(
+                float(torch.max(torch.abs(p - r))) for p, r in zip(probabilities, reference["probabilities"])),
+        }
+        if labels is not None:
+            entry["agreement_with_labels"] = sum(p == l for p, l in zip(predictions, labels)) / len(texts)
+        report[backend] = entry
+    return report
+
+
+def read_heldout_csv(file_path: str, text_column: str = "response", label_column: str = None):
+    texts, labels = [], []
+    with open(file_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            texts.append(row[text_column])
+            if label_column:
+                labels.append(int(float(row[label_column])))
+    return texts, (labels if label_column else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare TaaJ inference backends against fp32.")
+    parser.add_argument("model_dir", help="fine_tuned_taaj_model_<criterion> directory")
+    parser.add_argument("heldout_csv", help="CSV with held-out texts")
+    parser.add_argument("--text-column", default="response")
+    parser.add_argument("--label-column", default=None, help="LLM-judge score column, if present")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    args = parser.parse_args()
+
+    model_dir = Path(args.model_dir)
+    taaj_tokenizer = AutoTokenizer.from_pretrained(str(model_dir / "tokenizer"), local_files_only=True)
+    heldout_texts, heldout_labels = read_heldout_csv(args.heldout_csv, args.text_column, args.label_column)
+    print(json.dumps(parity_report(model_dir / "final_model", taaj_tokenizer, heldout_texts,
+                                   args.backends, heldout_labels), indent=2))
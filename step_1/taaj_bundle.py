@@ -0,0 +1,270 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+from run_manifest import atomic_write_json
+from taaj_backends import load_taaj_backend, read_heldout_csv
+from taaj_jury import taaj_model_path, taaj_tokenizer_path, tokenize_texts, score_token_ids
+
+# A bundle is one deployable directory for a set of criteria: a single shared tokenizer, every
+# distinct tensor of the criterion models stored once in bundle.safetensors (fp16, or int8 with
+# per-row scales), and bundle.json mapping each criterion's parameter names to those tensors.
+BUNDLE_WEIGHTS_FILE = "bundle.safetensors"
+BUNDLE_INDEX_FILE = "bundle.json"
+BUNDLE_DTYPES = ["fp16", "int8"]
+COMPUTE_DTYPES = {"fp32": torch.float32, "fp16": torch.float16}
+DEDUP_ATOL = 1e-3
+MIN_AGREEMENT = 0.99
+VALIDATION_CSV_PATTERN = "data/cry*_exp*-responses-*.csv"
+VALIDATION_ROWS = 512
+SCALE_SUFFIX = ".scale"
+
+
+def model_tensors(model) -> Dict[str, torch.Tensor]:
+    # Parameters plus non-persistent buffers (e.g. position_ids), which state_dict() leaves out.
+    tensors = dict(model.named_parameters(remove_duplicate=False))
+    tensors.update(model.named_buffers(remove_duplicate=False))
+    return {name: tensor.detach() for name, tensor in tensors.items()}
+
+
+def encode_tensor(key: str, tensor: torch.Tensor, dtype: str) -> Dict[str, torch.Tensor]:
+    # Only floating-point matrices are quantized; int8 keeps one fp32 scale per output row.
+    # Vectors (biases, LayerNorm) are tiny and stay fp16; integer buffers are stored as they are.
+    if not tensor.is_floating_point():
+        return {key: tensor.contiguous()}
+    if dtype == "int8" and tensor.dim() == 2:
+        scale = tensor.abs().amax(dim=1, keepdim=True).clamp(min=1e-12) / 127
+        return {key: torch.round(tensor / scale).to(torch.int8).contiguous(),
+                key + SCALE_SUFFIX: scale.float().contiguous()}
+    return {key: tensor.to(torch.float16).contiguous()}
+
+
+def decode_tensor(weights, key: str, compute_dtype: torch.dtype) -> torch.Tensor:
+    tensor = weights.get_tensor(key)
+    if key + SCALE_SUFFIX in weights.keys():
+        return (tensor.float() * weights.get_tensor(key + SCALE_SUFFIX)).to(compute_dtype)
+    return tensor.to(compute_dtype) if tensor.is_floating_point() else tensor
+
+
+class Int8Linear(torch.nn.Module):
+    # Keeps an int8 bundle's weight matrix (with its per-row scales) in memory as int8 and
+    # dequantizes it for the duration of one forward call, so only one layer at a time ever
+    # exists in the compute dtype.
+    def __init__(self, weight: torch.Tensor, scale: torch.Tensor, bias: torch.Tensor = None):
+        super().__init__()
+        self.register_buffer("weight", weight)
+        self.register_buffer("scale", scale)
+        self.register_buffer("bias", bias)
+
+    def forward(self, x):
+        return torch.nn.functional.linear(x, (self.weight.float() * self.scale).to(x.dtype), self.bias)
+
+
+class Int8Embedding(torch.nn.Module):
+    # Row-quantized lookup table: the looked-up rows are scaled after the gather, so the
+    # table itself stays int8.
+    def __init__(self, weight: torch.Tensor, scale: torch.Tensor, compute_dtype: torch.dtype):
+        super().__init__()
+        self.register_buffer("weight", weight)
+        self.register_buffer("scale", scale)
+        self.compute_dtype = compute_dtype
+
+    def forward(self, ids):
+        return (self.weight[ids].float() * self.scale[ids]).to(self.compute_dtype)
+
+
+def int8_module(weights, module, weight_key: str, bias_key: str, compute_dtype: torch.dtype, device):
+    weight = weights.get_tensor(weight_key).to(device)
+    scale = weights.get_tensor(weight_key + SCALE_SUFFIX).to(device)
+    if isinstance(module, torch.nn.Embedding):
+        return Int8Embedding(weight, scale, compute_dtype)
+    bias = decode_tensor(weights, bias_key, compute_dtype).to(device) if bias_key else None
+    return Int8Linear(weight, scale, bias)
+
+
+def dedup_tensors(models: Dict[str, Any], atol: float) -> Tuple[Dict[str, torch.Tensor], Dict[str, Dict[str, str]]]:
+    # Tensors with the same name are shared across criteria when every element is within atol
+    # of a tensor already kept (atol=0 shares exact copies only). Greedy: the first criterion
+    # holding a value becomes the stored copy.
+    unique: Dict[str, torch.Tensor] = {}
+    by_name: Dict[str, List[str]] = {}
+    index: Dict[str, Dict[str, str]] = {}
+    for criterion, model in models.items():
+        index[criterion] = {}
+        for name, tensor in model_tensors(model).items():
+            key = next((k for k in by_name.get(name, []) if unique[k].shape == tensor.shape
+                        and unique[k].dtype == tensor.dtype
+                        and (torch.equal(unique[k], tensor) if atol == 0 or not tensor.is_floating_point()
+                             else torch.allclose(unique[k], tensor, rtol=0, atol=atol))), None)
+            if key is None:
+                key = f"{name}@{len(by_name.get(name, []))}"
+                unique[key] = tensor
+                by_name.setdefault(name, []).append(key)
+            index[criterion][name] = key
+    return unique, index
+
+
+def bundle_agreement(reference: Dict[str, Any], candidate: Dict[str, Any], tokenizer,
+                     texts: List[str]) -> Dict[str, Dict[str, float]]:
+    sequences = tokenize_texts(texts, tokenizer)
+    device = torch.device("cpu")
+    expected = score_token_ids(sequences, reference, tokenizer.pad_token_id, device)
+    actual = score_token_ids(sequences, candidate, tokenizer.pad_token_id, device)
+    report = {}
+    for criterion in reference:
+        pairs = [(e[criterion], a[criterion]) for e, a in zip(expected, actual)]
+        report[criterion] = {
+            "agreement_with_fp32": sum(e["prediction"] == a["prediction"] for e, a in pairs) / len(pairs),
+            "max_prob_diff_vs_fp32": max(abs(e["probabilities"][label] - a["probabilities"][label])
+                                         for e, a in pairs for label in e["probabilities"]),
+        }
+    return report
+
+
+def build_bundle(criteria: List[str], model_dir: str, bundle_dir: str, dtype: str = "fp16",
+                 atol: float = DEDUP_ATOL, validation_texts: List[str] = None,
+                 min_agreement: float = MIN_AGREEMENT) -> Dict[str, Any]:
+    if dtype not in BUNDLE_DTYPES:
+        raise ValueError(f"Unknown bundle dtype {dtype!r}, expected one of {BUNDLE_DTYPES}")
+    if not validation_texts:
+        raise ValueError("Building a bundle needs validation texts for the accuracy check")
+    vocabs = {c: (taaj_tokenizer_path(model_dir, c) / "vocab.txt").read_bytes() for c in criteria}
+    mismatched = [c for c, vocab in vocabs.items() if vocab != vocabs[criteria[0]]]
+    if mismatched:
+        raise ValueError(f"Tokenizer vocabulary differs for criteria: {mismatched}")
+
+    models = {c: load_taaj_backend(taaj_model_path(model_dir, c), "fp32") for c in criteria}
+    unique, index = dedup_tensors(models, atol)
+    encoded = {}
+    for key, tensor in unique.items():
+        encoded.update(encode_tensor(key, tensor, dtype))
+
+    # Written next to the destination and renamed into place only once the check passes.
+    bundle_dir = Path(bundle_dir)
+    tmp_dir = bundle_dir.with_name(bundle_dir.name + ".inprogress")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    save_file(encoded, str(tmp_dir / BUNDLE_WEIGHTS_FILE), metadata={"dtype": dtype})
+    shutil.copytree(taaj_tokenizer_path(model_dir, criteria[0]), tmp_dir / "tokenizer")
+    meta = {
+        "dtype": dtype,
+        "dedup_atol": atol,
+        "criteria": {c: {"config": models[c].config.to_dict(), "tensors": index[c]} for c in criteria},
+    }
+    atomic_write_json(tmp_dir / BUNDLE_INDEX_FILE, meta)
+
+    # The Jury runs a bundle with fp32 or fp16 compute, so both are checked against fp32 weights.
+    tokenizer = AutoTokenizer.from_pretrained(str(tmp_dir / "tokenizer"), local_files_only=True)
+    report = {compute: bundle_agreement(models, load_bundle(tmp_dir, compute_dtype=compute)[1], tokenizer,
+                                        validation_texts)
+              for compute in COMPUTE_DTYPES}
+    failed = {f"{c} ({compute} compute)": r for compute, criteria_report in report.items()
+              for c, r in criteria_report.items() if r["agreement_with_fp32"] < min_agreement}
+    if failed:
+        shutil.rmtree(tmp_dir)
+        raise ValueError(f"Bundle predictions agree with fp32 below {min_agreement:.2%} for {sorted(failed)}: "
+                         f"{failed}; lower the dedup tolerance or use fp16")
+
+    if bundle_dir.exists():
+        shutil.rmtree(bundle_dir)
+    os.replace(tmp_dir, bundle_dir)
+    fp32_bytes = sum(t.numel() * 4 for m in models.values() for t in model_tensors(m).values())
+    return {
+        "criteria": criteria,
+        "dtype": dtype,
+        "tensors": sum(len(tensors) for tensors in index.values()),
+        "unique_tensors": len(unique),
+        "fp32_bytes": fp32_bytes,
+        "bundle_bytes": (bundle_dir / BUNDLE_WEIGHTS_FILE).stat().st_size,
+        "validation_rows": len(validation_texts),
+        "validation": report,
+    }
+
+
+def load_bundle(bundle_dir, criteria: List[str] = None, compute_dtype: str = "fp32",
+                device=None) -> Tuple[Any, Dict[str, Any]]:
+    # Returns (tokenizer, {criterion: model}). bundle.safetensors is memory-mapped and every
+    # shared tensor is materialized once and assigned to all models that use it; with an fp16
+    # bundle and fp16 compute the parameters are the mapped pages themselves. The Linear and
+    # Embedding weights of an int8 bundle stay int8 (Int8Linear, Int8Embedding), shared the
+    # same way, so an int8 bundle also saves RAM and not just disk.
+    bundle_dir = Path(bundle_dir)
+    meta = json.loads((bundle_dir / BUNDLE_INDEX_FILE).read_text())
+    criteria = criteria or list(meta["criteria"])
+    missing = [c for c in criteria if c not in meta["criteria"]]
+    if missing:
+        raise ValueError(f"Bundle {bundle_dir} has no models for criteria: {missing}")
+    dtype = COMPUTE_DTYPES[compute_dtype]
+    device = device or torch.device("cpu")
+
+    tokenizer = AutoTokenizer.from_pretrained(str(bundle_dir / "tokenizer"), local_files_only=True)
+    models = {}
+    shared = {}
+    int8_modules = {}
+    with safe_open(str(bundle_dir / BUNDLE_WEIGHTS_FILE), framework="pt") as weights:
+        keys = set(weights.keys())
+        for criterion in criteria:
+            entry = meta["criteria"][criterion]
+            config = AutoConfig.for_model(**entry["config"])
+            with torch.device("meta"):
+                model = AutoModelForSequenceClassification.from_config(config)
+            tensors = entry["tensors"]
+            replaced = set()
+            for module_name, module in list(model.named_modules()):
+                weight_key = tensors.get(f"{module_name}.weight")
+                if (not isinstance(module, (torch.nn.Linear, torch.nn.Embedding)) or weight_key is None
+                        or weight_key + SCALE_SUFFIX not in keys):
+                    continue
+                bias_key = tensors.get(f"{module_name}.bias")
+                if (weight_key, bias_key) not in int8_modules:
+                    int8_modules[(weight_key, bias_key)] = int8_module(weights, module, weight_key, bias_key,
+                                                                       dtype, device)
+                parent_name, _, leaf = module_name.rpartition(".")
+                setattr(model.get_submodule(parent_name), leaf, int8_modules[(weight_key, bias_key)])
+                replaced.update({f"{module_name}.weight", f"{module_name}.bias"})
+            for name, key in tensors.items():
+                if name in replaced:
+                    continue
+                if key not in shared:
+                    shared[key] = decode_tensor(weights, key, dtype).to(device)
+                module_name, _, leaf = name.rpartition(".")
+                module = model.get_submodule(module_name)
+                if leaf in module._parameters:
+                    module._parameters[leaf] = torch.nn.Parameter(shared[key], requires_grad=False)
+                else:
+                    module._buffers[leaf] = shared[key]
+            left_on_meta = [name for name, tensor in model_tensors(model).items() if tensor.is_meta]
+            if left_on_meta:
+                raise ValueError(f"Bundle {bundle_dir} is missing tensors for {criterion}: {left_on_meta}")
+            models[criterion] = model.eval()
+    return tokenizer, models
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bundle TaaJ criterion models into one deduplicated artifact.")
+    parser.add_argument("criteria", nargs="+", help="e.g. relevance_score clarity_score fluency_score safety_score")
+    parser.add_argument("--model-dir", default="../trained_taaj_models")
+    parser.add_argument("--output", required=True, help="bundle directory")
+    parser.add_argument("--dtype", default="fp16", choices=BUNDLE_DTYPES)
+    parser.add_argument("--dedup-atol", type=float, default=DEDUP_ATOL,
+                        help="share same-named tensors whose elements all differ by at most this (0: exact only)")
+    parser.add_argument("--validation-csv", default=VALIDATION_CSV_PATTERN, help="glob of CSVs with texts to check")
+    parser.add_argument("--text-column", default="response")
+    parser.add_argument("--validation-rows", type=int, default=VALIDATION_ROWS)
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT)
+    args = parser.parse_args()
+
+    texts = [text for path in sorted(glob.glob(args.validation_csv))
+             for text in read_heldout_csv(path, args.text_column)[0]][:args.validation_rows]
+    summary = build_bundle(args.criteria, args.model_dir, args.output, args.dtype, args.dedup_atol, texts,
+                           args.min_agreement)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,159 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+
+import numpy as np
+
+from run_manifest import atomic_write_json
+from score_cache import file_digest
+
+# A pre-tokenized corpus is a directory with the token ids of every row back to back in one
+# flat uint16 file, the row boundaries in offsets.npy (row i is ids[offsets[i]:offsets[i + 1]])
+# and the row ids in row_ids.npy. Judges read row slices straight from the memory map.
+CORPUS_IDS_FILE = "input_ids.u16"
+CORPUS_OFFSETS_FILE = "offsets.npy"
+CORPUS_ROW_IDS_FILE = "row_ids.npy"
+CORPUS_META_FILE = "corpus.json"
+CORPUS_TOKENIZER_DIR = "../trained_taaj_models/fine_tuned_taaj_model_relevance_score/tokenizer"
+TOKENIZE_CHUNK_ROWS = 1024
+TEXT_COLUMN = "response"
+
+
+def read_csv_rows(csv_paths: Iterable[str], text_column: str = TEXT_COLUMN) -> Iterator[Tuple[str, str]]:
+    # Row ids are "<path>:<#>", with the path as given and the 1-based row number the result
+    # CSVs already carry; the path, not just the file name, keeps same-named files apart.
+    for path in csv_paths:
+        with open(path, newline='', encoding='utf-8') as f:
+            for n, row in enumerate(csv.DictReader(f), start=1):
+                yield f"{path}:{row.get('#') or n}", row.get(text_column) or ""
+
+
+def build_corpus(csv_paths: List[str], tokenizer_dir: str, corpus_dir: str, text_column: str = TEXT_COLUMN,
+                 chunk_rows: int = TOKENIZE_CHUNK_ROWS) -> Dict[str, Any]:
+    from transformers import AutoTokenizer
+
+    from taaj_jury import tokenize_texts
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir, local_files_only=True)
+    if len(tokenizer) > np.iinfo(np.uint16).max + 1:
+        raise ValueError(f"Tokenizer has {len(tokenizer)} ids, too many for a uint16 corpus")
+
+    # Built in a sibling directory and renamed into place, so a crash never leaves half a corpus.
+    corpus_dir = Path(corpus_dir)
+    tmp_dir = corpus_dir.with_name(corpus_dir.name + ".inprogress")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    row_ids, lengths = [], []
+    rows = read_csv_rows(csv_paths, text_column)
+    with open(tmp_dir / CORPUS_IDS_FILE, "wb") as ids_file:
+        while chunk := list(islice(rows, chunk_rows)):
+            sequences = tokenize_texts([text for _, text in chunk], tokenizer)
+            for sequence in sequences:
+                np.asarray(sequence, dtype=np.uint16).tofile(ids_file)
+            row_ids.extend(row_id for row_id, _ in chunk)
+            lengths.extend(len(sequence) for sequence in sequences)
+        ids_file.flush()
+        os.fsync(ids_file.fileno())
+    if len(set(row_ids)) != len(row_ids):
+        shutil.rmtree(tmp_dir)
+        raise ValueError("Corpus row ids are not unique; is a CSV listed twice or a '#' value repeated?")
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    np.save(tmp_dir / CORPUS_OFFSETS_FILE, offsets, allow_pickle=False)
+    np.save(tmp_dir / CORPUS_ROW_IDS_FILE, np.array(row_ids, dtype=np.str_), allow_pickle=False)
+    meta = {
+        "rows": len(row_ids),
+        "tokens": int(offsets[-1]),
+        "text_column": text_column,
+        "sources": [str(path) for path in csv_paths],
+        "vocab_sha256": file_digest(Path(tokenizer_dir) / "vocab.txt"),
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    atomic_write_json(tmp_dir / CORPUS_META_FILE, meta)
+    if corpus_dir.exists():
+        shutil.rmtree(corpus_dir)
+    os.replace(tmp_dir, corpus_dir)
+    return meta
+
+
+class TokenCorpus:
+    # Read-only view of a pre-tokenized corpus. ids() returns a slice of the memory map, so
+    # building a batch touches only the pages of the rows in it and copies nothing until the
+    # padded input tensor is filled.
+    def __init__(self, corpus_dir: str):
+        self.corpus_dir = Path(corpus_dir)
+        self.meta = json.loads((self.corpus_dir / CORPUS_META_FILE).read_text())
+        self.offsets = np.load(self.corpus_dir / CORPUS_OFFSETS_FILE, allow_pickle=False)
+        self.row_ids = np.load(self.corpus_dir / CORPUS_ROW_IDS_FILE, allow_pickle=False)
+        # Copy-on-write mapping: pages stay shared with the page cache (nothing writes to them),
+        # but the arrays are writable, which torch.as_tensor expects. np.memmap cannot map an
+        # empty file.
+        self.input_ids = (np.memmap(self.corpus_dir / CORPUS_IDS_FILE, dtype=np.uint16, mode="c")
+                          if self.offsets[-1] else np.zeros(0, dtype=np.uint16))
+        self.positions = None
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def ids(self, idx: int) -> np.ndarray:
+        return self.input_ids[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def index_of(self, row_id: str) -> int:
+        if self.positions is None:
+            self.positions = {row_id: idx for idx, row_id in enumerate(self.row_ids.tolist())}
+        return self.positions[row_id]
+
+    def sequences(self, indices: Iterable[int]) -> List[np.ndarray]:
+        return [self.ids(idx) for idx in indices]
+
+    def check_tokenizer(self, tokenizer_dir):
+        if file_digest(Path(tokenizer_dir) / "vocab.txt") != self.meta["vocab_sha256"]:
+            raise ValueError(f"Corpus {self.corpus_dir} was tokenized with a different vocabulary than {tokenizer_dir}")
+
+
+def write_corpus_scores(corpus: TokenCorpus, jury, output_path: str):
+    columns = ["row_id"] + [f"taaj_{criterion}_{field}" for criterion in jury.criteria
+                            for field in ("prediction", "response_time_sec")]
+    with open(output_path, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row_id, verdict in zip(corpus.row_ids.tolist(), jury.evaluate_corpus(corpus)):
+            writer.writerow([row_id] + [value for criterion in jury.criteria
+                                        for value in (verdict[criterion]["prediction"],
+                                                      round(verdict[criterion]["response_time"], 6))])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-tokenize result CSVs once and score them with the TaaJ jury.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="tokenize result CSVs into a memory-mapped corpus")
+    build_parser.add_argument("csv", nargs="+", help="result CSVs or glob patterns")
+    build_parser.add_argument("--corpus", required=True, help="output corpus directory")
+    build_parser.add_argument("--tokenizer", default=CORPUS_TOKENIZER_DIR)
+    build_parser.add_argument("--text-column", default=TEXT_COLUMN)
+    score_parser = subparsers.add_parser("score", help="score every corpus row with the TaaJ jury")
+    score_parser.add_argument("--corpus", required=True)
+    score_parser.add_argument("--criteria", nargs="+", required=True, help="e.g. relevance_score safety_score")
+    score_parser.add_argument("--model-dir", default="../trained_taaj_models")
+    score_parser.add_argument("--backend", default="fp32", choices=["fp32", "int8", "onnx"])
+    score_parser.add_argument("--output", required=True, help="CSV of row_id and per-criterion predictions")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        paths = sorted({path for pattern in args.csv for path in (glob.glob(pattern) or [pattern])})
+        corpus_meta = build_corpus(paths, args.tokenizer, args.corpus, args.text_column)
+        print(f"Corpus {args.corpus}: {corpus_meta['rows']} rows, {corpus_meta['tokens']} tokens "
+              f"from {len(paths)} files")
+    else:
+        from taaj_jury import Jury
+
+        write_corpus_scores(TokenCorpus(args.corpus), Jury(args.criteria, args.model_dir, backend=args.backend),
+                            args.output)
+        print(f"Scores written to {args.output}")
@@ -0,0 +1,81 @@
+import math
+import resource
+import sys
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import List, Dict, Any
+
+SPAN_HISTORY = 100_000
+PROC_STATUS = "/proc/self/status"
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank percentile; the inputs are small per-span sample lists.
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def latency_summary(durations_ns) -> Dict[str, Any]:
+    values = sorted(durations_ns)
+    to_ms = 1e-6
+    return {
+        "count": len(values),
+        "total_ms": sum(values) * to_ms,
+        "mean_ms": (sum(values) / len(values) * to_ms) if values else 0.0,
+        "p50_ms": percentile(values, 50) * to_ms,
+        "p95_ms": percentile(values, 95) * to_ms,
+        "p99_ms": percentile(values, 99) * to_ms,
+    }
+
+
+def peak_rss_mb() -> float:
+    # On Linux VmHWM, the peak since the last reset_peak_rss(); elsewhere ru_maxrss, the
+    # all-time peak (kilobytes on Linux, bytes on macOS).
+    try:
+        with open(PROC_STATUS, encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_rss() -> bool:
+    # Writing 5 to clear_refs resets VmHWM to the current RSS, so the next peak_rss_mb() covers
+    # only what ran in between. Returns False where the peak cannot be reset.
+    try:
+        with open(PROC_CLEAR_REFS, "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class SpanRecorder:
+    # Collects perf_counter_ns durations of named hot-path spans (tokenize, h2d, forward, ...).
+    # Only the most recent `history` samples per span are kept, so a resident jury stays bounded.
+    def __init__(self, history: int = SPAN_HISTORY):
+        self.spans = defaultdict(lambda: deque(maxlen=history))
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.spans[name].append(time.perf_counter_ns() - start)
+
+    def last_seconds(self, name: str) -> float:
+        return self.spans[name][-1] / 1e9 if self.spans[name] else 0.0
+
+    def reset(self):
+        self.spans.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: latency_summary(durations) for name, durations in self.spans.items()}
@@ -0,0 +1,351 @@
+import json
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator
+
+import torch
+from transformers import AutoTokenizer
+
+from taaj_backends import load_taaj_backend, onnx_export_path
+from taaj_instrumentation import SpanRecorder
+
+TAAJ_MODEL_DIR = "../trained_taaj_models"
+SCORE_LABELS = [f"SCORE_{score}" for score in range(6)]
+MAX_TOKENS_PER_BATCH = 8192
+STREAM_CHUNK_SIZE = 512
+MAX_WINDOW_TOKENS = 512  # DistilBERT's max_position_embeddings
+WINDOW_STRIDE = 128  # tokens shared by consecutive windows
+WINDOW_POOLINGS = ["mean", "min", "attention"]
+
+
+def taaj_model_path(model_dir: str, criterion: str) -> Path:
+    return Path(f"{model_dir}/fine_tuned_taaj_model_{criterion}/final_model").resolve()
+
+
+def taaj_tokenizer_path(model_dir: str, criterion: str) -> Path:
+    return Path(f"{model_dir}/fine_tuned_taaj_model_{criterion}/tokenizer").resolve()
+
+
+def tokenize_texts(texts: List[str], tokenizer) -> List[List[int]]:
+    return tokenizer(list(texts), truncation=True, padding=False)["input_ids"]
+
+
+def tokenize_full_texts(texts: List[str], tokenizer) -> List[List[int]]:
+    # Whole texts without special tokens, for split_windows(); verbose=False silences the
+    # tokenizer's warning about sequences longer than the model accepts.
+    return tokenizer(list(texts), add_special_tokens=False, truncation=False, padding=False,
+                     verbose=False)["input_ids"]
+
+
+def split_windows(ids: List[int], cls_token_id: int, sep_token_id: int, pad_token_id: int,
+                  max_length: int = MAX_WINDOW_TOKENS, stride: int = WINDOW_STRIDE) -> List[tuple]:
+    # Overlapping [CLS] ... [SEP] windows covering every token. The last window is aligned to
+    # the end of the text, so there is no short tail window. Windows made only of padding
+    # are dropped, but every text keeps at least one window.
+    body = max_length - 2
+    if body <= stride:
+        raise ValueError(f"Window stride {stride} must be smaller than the window body ({body} tokens)")
+    starts = [0] if len(ids) <= body else [*range(0, len(ids) - body, body - stride), len(ids) - body]
+    windows = [(cls_token_id, *ids[start:start + body], sep_token_id) for start in starts]
+    kept = [window for window in windows if any(token != pad_token_id for token in window[1:-1])]
+    return kept or windows[:1]
+
+
+def pool_windows(window_results: List[Dict[str, Any]], pooling: str = "mean") -> Dict[str, float]:
+    # mean: average window logits (softmax of the mean log-probabilities, which differ from
+    # the logits by a per-window constant). min: the window with the lowest expected score,
+    # so one unsafe passage decides the verdict. attention: log-probabilities weighted by a
+    # softmax over each window's confidence, so decisive windows count most.
+    probs = torch.tensor([[result["probabilities"][label] for label in SCORE_LABELS] for result in window_results])
+    log_probs = probs.clamp_min(1e-12).log()
+    if pooling == "mean":
+        pooled = torch.softmax(log_probs.mean(dim=0), dim=-1)
+    elif pooling == "min":
+        expected = probs @ torch.arange(len(SCORE_LABELS), dtype=probs.dtype)
+        pooled = probs[int(torch.argmin(expected))]
+    elif pooling == "attention":
+        weights = torch.softmax(log_probs.max(dim=1).values, dim=0)
+        pooled = torch.softmax((weights[:, None] * log_probs).sum(dim=0), dim=-1)
+    else:
+        raise ValueError(f"Unknown window pooling {pooling!r}, expected one of {WINDOW_POOLINGS}")
+    return dict(zip(SCORE_LABELS, pooled.tolist()))
+
+
+def bucket_by_length(lengths: List[int], max_tokens_per_batch: int = MAX_TOKENS_PER_BATCH) -> Iterator[List[int]]:
+    # Sorting by length keeps similar-length sequences together, so a bucket's padded
+    # size (longest * count) stays close to its real token count.
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    bucket, longest = [], 0
+    for idx in order:
+        candidate = max(longest, lengths[idx])
+        if bucket and candidate * (len(bucket) + 1) > max_tokens_per_batch:
+            yield bucket
+            bucket, candidate = [], lengths[idx]
+        bucket.append(idx)
+        longest = candidate
+    if bucket:
+        yield bucket
+
+
+def pad_batch(sequences: List[List[int]], pad_token_id: int, device) -> Dict[str, torch.Tensor]:
+    longest = max(len(seq) for seq in sequences)
+    input_ids = torch.full((len(sequences), longest), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+    for row, seq in enumerate(sequences):
+        # Sequences may be lists or uint16 slices of a memory-mapped corpus.
+        input_ids[row, :len(seq)] = torch.as_tensor(seq, dtype=torch.long)
+        attention_mask[row, :len(seq)] = 1
+    return {"input_ids": input_ids.to(device), "attention_mask": attention_mask.to(device)}
+
+
+def score_token_ids(sequences: List[List[int]], models: Dict[str, Any], pad_token_id: int, device,
+                    max_tokens_per_batch: int = MAX_TOKENS_PER_BATCH,
+                    spans: SpanRecorder = None) -> List[Dict[str, Any]]:
+    spans = spans or SpanRecorder()
+    results = [{} for _ in sequences]
+    # A bucket is scored in one forward pass, so each text's response_time is its share of
+    # that pass (the pass time over batch_size), not the time of the whole bucket.
+    for bucket in bucket_by_length([len(seq) for seq in sequences], max_tokens_per_batch):
+        with spans.span("h2d"):
+            inputs = pad_batch([sequences[idx] for idx in bucket], pad_token_id, device)
+        for name, model in models.items():
+            with spans.span("forward"):
+                with torch.no_grad():
+                    logits = model(**inputs).logits
+                if device is not None and torch.device(device).type == "cuda":
+                    torch.cuda.synchronize()
+            duration = spans.last_seconds("forward")
+            with spans.span("postprocess"):
+                probabilities = torch.softmax(logits.float(), dim=-1).cpu()
+                predictions = torch.argmax(probabilities, dim=-1).tolist()
+                for idx, prediction, probs in zip(bucket, predictions, probabilities.tolist()):
+                    results[idx][name] = {
+                        "prediction": prediction,
+                        "probabilities": dict(zip(SCORE_LABELS, probs)),
+                        "response_time": duration / len(bucket),
+                        "batch_size": len(bucket),
+                    }
+    return results
+
+
+def score_long_token_ids(sequences: List[List[int]], models: Dict[str, Any], tokenizer, device,
+                         max_tokens_per_batch: int = MAX_TOKENS_PER_BATCH, spans: SpanRecorder = None,
+                         pooling: str = "mean", max_length: int = MAX_WINDOW_TOKENS,
+                         stride: int = WINDOW_STRIDE) -> List[Dict[str, Any]]:
+    # Sliding-window scoring of untruncated sequences (from tokenize_full_texts). The windows of
+    # all texts are scored together in one bucketed pass, and identical windows (repeated
+    # texts or passages) only once; each text's window scores are then pooled into one verdict.
+    window_ids: Dict[tuple, int] = {}
+    text_windows = []
+    for ids in sequences:
+        windows = split_windows(ids, tokenizer.cls_token_id, tokenizer.sep_token_id, tokenizer.pad_token_id,
+                                max_length, stride)
+        text_windows.append([window_ids.setdefault(window, len(window_ids)) for window in windows])
+    scored = score_token_ids(list(window_ids), models, tokenizer.pad_token_id, device, max_tokens_per_batch, spans)
+
+    results = []
+    for windows in text_windows:
+        result = {}
+        for name in models:
+            window_results = [scored[window][name] for window in windows]
+            probabilities = pool_windows(window_results, pooling)
+            result[name] = {
+                "prediction": max(range(len(SCORE_LABELS)), key=lambda k: probabilities[SCORE_LABELS[k]]),
+                "probabilities": probabilities,
+                # Each window carries its share of its forward pass, so the sum counts no pass twice.
+                "response_time": sum(r["response_time"] for r in window_results),
+                "windows": len(windows),
+            }
+        results.append(result)
+    return results
+
+
+def score_with_cache(texts: List[str], model, tokenizer, device, max_tokens_per_batch: int,
+                     cache=None, fingerprint: str = None, spans: SpanRecorder = None) -> List[Dict[str, Any]]:
+    # Cache lookups happen before tokenization, so fully cached chunks cost no model work.
+    results = cache.get_many(fingerprint, texts) if cache else {}
+    misses = [idx for idx in range(len(texts)) if idx not in results]
+    if misses:
+        spans = spans or SpanRecorder()
+        with spans.span("tokenize"):
+            miss_sequences = tokenize_texts([texts[idx] for idx in misses], tokenizer)
+        scored = [result["taaj"] for result in score_token_ids(
+            miss_sequences, {"taaj": model}, tokenizer.pad_token_id, device, max_tokens_per_batch, spans)]
+        if cache:
+            cache.put_many(fingerprint, [texts[idx] for idx in misses], scored)
+        results.update(zip(misses, scored))
+    return [results[idx] for idx in range(len(texts))]
+
+
+def predict_taaj_batch(texts: Iterable[str], taaj_model, taaj_tokenizer, taaj_device,
+                       max_tokens_per_batch: int = MAX_TOKENS_PER_BATCH,
+                       chunk_size: int = STREAM_CHUNK_SIZE, cache=None,
+                       fingerprint: str = None, spans: SpanRecorder = None) -> Iterator[Dict[str, Any]]:
+    # Yields one result per text in input order; texts are consumed chunk_size at a time
+    # so arbitrarily long iterables are scored without materialising them.
+    if cache and not fingerprint:
+        raise ValueError("A score cache needs the model fingerprint")
+    texts = iter(texts)
+    while True:
+        chunk = list(islice(texts, chunk_size))
+        if not chunk:
+            return
+        yield from score_with_cache(chunk, taaj_model, taaj_tokenizer, taaj_device, max_tokens_per_batch,
+                                    cache, fingerprint, spans)
+
+
+class Jury:
+    # All criterion models are fine-tuned from the same DistilBERT base and ship an
+    # identical tokenizer, so the jury keeps one tokenizer and every model resident.
+    def __init__(self, criteria: List[str], model_dir: str = TAAJ_MODEL_DIR, device=None,
+                 max_tokens_per_batch: int = MAX_TOKENS_PER_BATCH, backend: str = "fp32", cache=None,
+                 num_threads: int = 0, bundle: str = None, window_pooling: str = None,
+                 window_stride: int = WINDOW_STRIDE):
+        if not criteria:
+            raise ValueError("Jury needs at least one criterion")
+        self.spans = SpanRecorder()
+        self.criteria = list(criteria)
+        self.model_dir = model_dir
+        self.backend = backend
+        if backend == "fp32":
+            self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        else:
+            self.device = torch.device("cpu")
+        self.max_tokens_per_batch = max_tokens_per_batch
+        # With a window pooling set, texts longer than one window are scored as overlapping
+        # windows instead of being truncated (see score_long_token_ids).
+        if window_pooling and window_pooling not in WINDOW_POOLINGS:
+            raise ValueError(f"Unknown window pooling {window_pooling!r}, expected one of {WINDOW_POOLINGS}")
+        self.window_pooling = window_pooling
+        self.window_stride = window_stride
+
+        self.cache = cache
+        self.fingerprints = {}
+        if bundle:
+            self.load_bundle(bundle)
+        else:
+            self.load_models(num_threads)
+        if window_pooling:
+            self.fingerprints = {c: f"{fingerprint}|window-{window_pooling}-{window_stride}"
+                                 for c, fingerprint in self.fingerprints.items()}
+
+    def load_models(self, num_threads: int = 0):
+        vocabs = {c: (taaj_tokenizer_path(self.model_dir, c) / "vocab.txt").read_bytes() for c in self.criteria}
+        reference = vocabs[self.criteria[0]]
+        mismatched = [c for c, vocab in vocabs.items() if vocab != reference]
+        if mismatched:
+            raise ValueError(f"Tokenizer vocabulary differs for criteria: {mismatched}")
+
+        self.tokenizer_path = taaj_tokenizer_path(self.model_dir, self.criteria[0])
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.tokenizer_path), local_files_only=True)
+        self.models = {}
+        for criterion in self.criteria:
+            print(f"Loading TaaJ model ({self.backend}): {taaj_model_path(self.model_dir, criterion)}")
+            with self.spans.span("load"):
+                self.models[criterion] = load_taaj_backend(taaj_model_path(self.model_dir, criterion),
+                                                           self.backend, self.device, num_threads)
+
+        if self.cache:
+            for criterion in self.criteria:
+                model_path = taaj_model_path(self.model_dir, criterion)
+                extra_files = [onnx_export_path(model_path)] if self.backend == "onnx" else []
+                self.fingerprints[criterion] = self.cache.fingerprint(
+                    model_path, taaj_tokenizer_path(self.model_dir, criterion), self.backend, extra_files)
+
+    def load_bundle(self, bundle: str):
+        # A bundle built by taaj_bundle.py already carries one checked tokenizer; the backend
+        # names the compute dtype ("fp32" or "fp16") of its memory-mapped weights. int8 bundles
+        # stay int8 in memory with either; an fp16 bundle only stays mapped with fp16 compute.
+        from taaj_bundle import load_bundle, BUNDLE_INDEX_FILE
+
+        if self.backend not in ("fp32", "fp16"):
+            raise ValueError(f"A TaaJ bundle runs with the fp32 or fp16 backend, not {self.backend!r}")
+        print(f"Loading TaaJ bundle ({self.backend}): {bundle}")
+        if self.backend == "fp32" and json.loads((Path(bundle) / BUNDLE_INDEX_FILE).read_text())["dtype"] == "fp16":
+            print("Note: fp16 bundle weights are expanded to fp32 in memory; "
+                  "--taaj-backend fp16 runs them from the mapped file")
+        with self.spans.span("load"):
+            self.tokenizer, self.models = load_bundle(bundle, self.criteria, self.backend, self.device)
+        self.tokenizer_path = Path(bundle) / "tokenizer"
+        if self.cache:
+            for criterion in self.criteria:
+                self.fingerprints[criterion] = self.cache.fingerprint(
+                    Path(bundle), self.tokenizer_path, f"bundle-{self.backend}-{criterion}")
+
+    def evaluate_stream(self, texts: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE,
+                        use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        # use_cache=False scores without reading or filling the score cache, for throwaway
+        # texts such as the partial generations checked while streaming.
+        cache = self.cache if use_cache else None
+        texts = iter(texts)
+        while True:
+            chunk = list(islice(texts, chunk_size))
+            if not chunk:
+                return
+            cached = {c: cache.get_many(self.fingerprints[c], chunk) if cache else {}
+                      for c in self.criteria}
+            misses = sorted({idx for c in self.criteria for idx in range(len(chunk)) if idx not in cached[c]})
+            # Repeated texts in a chunk are tokenized and scored once, under their first index.
+            first = {}
+            for idx in misses:
+                first.setdefault(chunk[idx], idx)
+            unique = list(first.values())
+            tokenize = tokenize_full_texts if self.window_pooling else tokenize_texts
+            with self.spans.span("tokenize"):
+                sequences = dict(zip(unique, tokenize([chunk[idx] for idx in unique], self.tokenizer))) if unique else {}
+            tokenize_time = self.spans.last_seconds("tokenize")
+
+            # Criteria missing the same texts share one bucketed pass over one tokenization.
+            groups = {}
+            for criterion in self.criteria:
+                pending = tuple(idx for idx in unique if idx not in cached[criterion])
+                if pending:
+                    groups.setdefault(pending, []).append(criterion)
+            for pending, criteria in groups.items():
+                models = {c: self.models[c] for c in criteria}
+                if self.window_pooling:
+                    scored = score_long_token_ids([sequences[idx] for idx in pending], models, self.tokenizer,
+                                                  self.device, self.max_tokens_per_batch, self.spans,
+                                                  self.window_pooling, MAX_WINDOW_TOKENS, self.window_stride)
+                else:
+                    scored = score_token_ids([sequences[idx] for idx in pending], models,
+                                             self.tokenizer.pad_token_id, self.device, self.max_tokens_per_batch,
+                                             self.spans)
+                for criterion in criteria:
+                    criterion_scored = [result[criterion] for result in scored]
+                    if cache:
+                        cache.put_many(self.fingerprints[criterion], [chunk[idx] for idx in pending],
+                                            criterion_scored)
+                    cached[criterion].update(zip(pending, criterion_scored))
+            for criterion in self.criteria:
+                for idx in misses:
+                    if idx not in cached[criterion]:
+                        cached[criterion][idx] = dict(cached[criterion][first[chunk[idx]]])
+
+            results = [{"tokenize_time": tokenize_time} for _ in chunk]
+            for criterion in self.criteria:
+                for idx, result in enumerate(results):
+                    result[criterion] = cached[criterion][idx]
+            yield from results
+
+    def evaluate_corpus(self, corpus, indices: Iterable[int] = None,
+                        chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        # Scores rows of a pre-tokenized TokenCorpus (taaj_corpus.py): every criterion reads
+        # the same memory-mapped id slices, so nothing is tokenized and nothing is cached.
+        # Corpus rows are truncated at build time, so there is nothing to pool windows over.
+        if self.window_pooling:
+            raise ValueError("evaluate_corpus scores truncated corpus rows and does not support window pooling")
+        corpus.check_tokenizer(self.tokenizer_path)
+        indices = iter(range(len(corpus)) if indices is None else indices)
+        while True:
+            chunk = list(islice(indices, chunk_size))
+            if not chunk:
+                return
+            scored = score_token_ids(corpus.sequences(chunk), self.models, self.tokenizer.pad_token_id,
+                                     self.device, self.max_tokens_per_batch, self.spans)
+            for result in scored:
+                result["tokenize_time"] = 0.0
+            yield from scored
+
+    def evaluate(self, texts: List[str], use_cache: bool = True) -> List[Dict[str, Any]]:
+        return list(self.evaluate_stream(texts, use_cache=use_cache))
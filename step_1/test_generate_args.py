@@ -0,0 +1,47 @@
+import pytest
+
+from script_generate_dataset import parse_args
+
+
+def test_regenerate_parses_thresholds():
+    args = parse_args(["--taaj", "--criteria", "0", "6", "--regenerate", "safety_score=3"])
+    assert args.regenerate == {"safety_score": 3}
+
+
+def test_regenerate_rejects_unselected_criteria(capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["--taaj", "--criteria", "0", "--regenerate", "safety_score=3"])
+    assert "not among the selected --criteria" in capsys.readouterr().err
+
+
+def test_regenerate_needs_taaj():
+    with pytest.raises(SystemExit):
+        parse_args(["--regenerate", "relevance_score=3"])
+
+
+def test_fp16_backend_needs_a_bundle(capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["--taaj", "--taaj-backend", "fp16"])
+    assert "--taaj-bundle" in capsys.readouterr().err
+    assert parse_args(["--taaj", "--taaj-backend", "fp16", "--taaj-bundle", "bundle"]).taaj_bundle == "bundle"
+
+
+def test_early_stop_checkpoints_are_configurable():
+    args = parse_args(["--taaj", "--criteria", "6", "--regenerate", "safety_score=3", "--check-every-tokens", "0",
+                       "--check-every-sentences", "2", "--early-stop-confidence", "0.9", "--max-attempts", "5"])
+    assert (args.check_every_tokens, args.check_every_sentences, args.early_stop_confidence, args.max_attempts) == \
+        (0, 2, 0.9, 5)
+    with pytest.raises(SystemExit):
+        parse_args(["--early-stop-confidence", "1.5"])
+    with pytest.raises(SystemExit):
+        parse_args(["--max-attempts", "0"])
+
+
+def test_criteria_need_a_trained_model(tmp_path, capsys):
+    (tmp_path / "fine_tuned_taaj_model_safety_score" / "final_model").mkdir(parents=True)
+    assert parse_args(["--taaj", "--taaj-model-dir", str(tmp_path), "--criteria", "6"]).criteria == [6]
+    with pytest.raises(SystemExit):
+        parse_args(["--taaj", "--taaj-model-dir", str(tmp_path), "--criteria", "3", "6"])
+    assert "--criteria [3] have no trained model" in capsys.readouterr().err
+    # Without --taaj no judge is loaded, so nothing is checked.
+    assert parse_args(["--taaj-model-dir", str(tmp_path), "--criteria", "3"]).criteria == [3]
@@ -0,0 +1,58 @@
+import csv
+import json
+
+import pytest
+
+import script_generate_dataset as generate
+
+
+class FakeClient:
+    # Answers chat() like ollama.Client, failing on call number fail_on (1-based).
+    def __init__(self, fail_on: int = None):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def chat(self, model, messages, keep_alive=None):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise ConnectionError("Ollama went away")
+        return {"message": {"content": f"answer {self.calls}"}, "eval_count": 2,
+                "prompt_eval_count": 10, "prompt_eval_duration": 1_000_000}
+
+
+@pytest.fixture
+def cell(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(generate, "NUM_RESPONSES", 3)
+    monkeypatch.setattr(generate, "CSV_WRITE_INTERVAL", 2)
+    monkeypatch.setattr(generate, "scenario_generator", None)
+    monkeypatch.setattr(generate, "scenario_cursor", 0)
+    return generate.experiment_result_path("m", 1)
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_results_with_other_columns_are_moved_aside_before_generating(cell, tmp_path, monkeypatch):
+    with open(cell, "w", newline='', encoding='utf-8') as f:
+        f.write("#,prompt,response,duration_sec\n1,p,old answer,1.0\n")
+    monkeypatch.setattr(generate, "client", FakeClient())
+
+    generate.run_experiment("m", 1, scenario_offset=0)
+
+    assert [row["response"] for row in read_rows(cell)] == ["answer 1", "answer 2", "answer 3"]
+    rotated = list(tmp_path.glob("*.superseded-*"))
+    assert len(rotated) == 1 and "old answer" in rotated[0].read_text()
+
+
+def test_rows_generated_before_a_failure_are_committed(cell, monkeypatch):
+    monkeypatch.setattr(generate, "client", FakeClient(fail_on=2))
+
+    with pytest.raises(ConnectionError):
+        generate.run_experiment("m", 1, scenario_offset=0)
+
+    # Row 1 was still buffered (CSV_WRITE_INTERVAL=2) when the second generation failed.
+    assert [row["#"] for row in read_rows(cell)] == ["1"]
+    assert json.loads(open(f"{cell}.manifest.json").read())["completed"] == [0]
@@ -0,0 +1,61 @@
+import asyncio
+import random
+
+from generation_pipeline import run_generation_pipeline, chat_messages
+
+
+class FakeAsyncClient:
+    # Answers chat() after a random delay and tracks how many chats are in flight.
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def chat(self, model, messages, keep_alive=None):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(self.rng.uniform(0, 0.01))
+        self.in_flight -= 1
+        return {"message": {"content": f"re: {messages[-1]['content']}"}}
+
+
+class CountingJury:
+    def __init__(self):
+        self.batches = []
+
+    def evaluate(self, texts):
+        self.batches.append(len(texts))
+        return [{"text": text} for text in texts]
+
+
+def run(prompts, concurrency, jury=None, judge_batch_size=16):
+    client = FakeAsyncClient()
+    results = []
+    asyncio.run(run_generation_pipeline(client, "m", prompts, jury,
+                                        lambda i, response, duration, verdict: results.append((i, response, verdict)),
+                                        concurrency, judge_batch_size))
+    return client, results
+
+
+def test_results_arrive_in_prompt_order():
+    prompts = [f"prompt {n}" for n in range(50)]
+    jury = CountingJury()
+    _, results = run(prompts, concurrency=4, jury=jury, judge_batch_size=8)
+
+    assert [i for i, _, _ in results] == list(range(50))
+    assert all(response["message"]["content"] == f"re: prompt {i}" for i, response, _ in results)
+    assert all(verdict == {"text": f"re: prompt {i}"} for i, _, verdict in results)
+    assert sum(jury.batches) == 50 and max(jury.batches) <= 8
+
+
+def test_concurrency_stays_bounded():
+    for concurrency in (1, 3, 8):
+        client, results = run([f"prompt {n}" for n in range(40)], concurrency)
+        assert len(results) == 40
+        assert client.peak_in_flight == concurrency
+
+
+def test_chat_messages_put_the_system_prompt_first():
+    assert chat_messages("hi", "be brief") == [{"role": "system", "content": "be brief"},
+                                               {"role": "user", "content": "hi"}]
+    assert chat_messages("hi") == [{"role": "user", "content": "hi"}]
@@ -0,0 +1,75 @@
+import time
+
+from grid_scheduler import GridScheduler, plan_grid
+
+
+class TimingManager:
+    # The part of OllamaModelManager the scheduler uses, recording ensure() calls.
+    def __init__(self):
+        self.timings = {}
+        self.ensured = []
+
+    def timing(self, name):
+        return self.timings.setdefault(name, {"pull_sec": 0.0, "wait_sec": 0.0, "generate_sec": 0.0})
+
+    def ensure(self, name, keep=None):
+        self.ensured.append(name)
+
+    def prefetch(self, name):
+        pass
+
+    def touch(self, name):
+        pass
+
+
+def sleep_cell(task):
+    # Logs (model, start, end) to a file per cell, so the parent can check the overlap.
+    start = time.time()
+    time.sleep(0.3)
+    with open(task["log"], "a") as f:
+        f.write(f"{task['model']} {start} {time.time()}\n")
+    return {"cells": 1, "seconds": time.time() - start}
+
+
+def grid_with_log(tmp_path, models, experiments):
+    groups = plan_grid(models, experiments, 10)
+    for group in groups:
+        for task in group:
+            task["log"] = str(tmp_path / "cells.log")
+    return groups
+
+
+def read_log(tmp_path):
+    return [(model, float(start), float(end)) for model, start, end in
+            (line.split() for line in (tmp_path / "cells.log").read_text().splitlines())]
+
+
+def test_plan_grid_offsets_follow_sequential_order_and_priority():
+    groups = plan_grid(["a", "b"], [1, 2], 5, {"b": 1})
+    assert [[(t["model"], t["experiment"], t["offset"]) for t in group] for group in groups] == [
+        [("b", 1, 10), ("b", 2, 15)], [("a", 1, 0), ("a", 2, 5)]]
+
+
+def test_one_model_at_a_time_and_wall_time_accounting(tmp_path):
+    manager = TimingManager()
+    scheduler = GridScheduler(sleep_cell, workers=3, model_manager=manager, progress_interval=5)
+    assert scheduler.run(grid_with_log(tmp_path, ["a", "b"], [1, 2])) == []
+
+    cells = read_log(tmp_path)
+    a_end = max(end for model, _, end in cells if model == "a")
+    b_start = min(start for model, start, _ in cells if model == "b")
+    assert b_start >= a_end
+    assert scheduler.counters["cells"] == 4
+    # Two cells of a model ran side by side: generate_sec is their wall time, not their sum.
+    for name in ("a:latest", "b:latest"):
+        assert 0.3 <= manager.timings[name]["generate_sec"] < 0.55
+    assert manager.ensured == ["a", "b"]
+
+
+def test_max_models_lets_groups_overlap(tmp_path):
+    scheduler = GridScheduler(sleep_cell, workers=4, progress_interval=5, max_models=2)
+    scheduler.run(grid_with_log(tmp_path, ["a", "b"], [1, 2]))
+    cells = read_log(tmp_path)
+    a_end = max(end for model, _, end in cells if model == "a")
+    b_start = min(start for model, start, _ in cells if model == "b")
+    assert b_start < a_end
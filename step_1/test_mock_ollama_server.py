@@ -0,0 +1,40 @@
+import json
+import time
+import urllib.request
+
+import pytest
+
+from mock_ollama_server import start_mock_server
+
+
+@pytest.fixture
+def server():
+    server = start_mock_server(["one two three"], port=0, ttft=0.05, tokens_per_sec=1000.0, jitter=0.0,
+                               prefill_tokens_per_sec=100.0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def chat(server, content):
+    host, port = server.server_address
+    body = json.dumps({"model": "m", "stream": False, "messages": [{"role": "user", "content": content}]})
+    request = urllib.request.Request(f"http://{host}:{port}/api/chat", data=body.encode(), method="POST")
+    start = time.time()
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read()), time.time() - start
+
+
+def test_prompt_eval_is_fixed_ttft_plus_prefill_of_uncached_tokens(server):
+    prompt = " ".join(f"w{n}" for n in range(20))
+    first, first_sec = chat(server, prompt)
+    assert first["prompt_eval_count"] == 20
+    assert first["prompt_eval_duration"] == pytest.approx(0.2e9)
+    assert first_sec >= 0.25
+
+    # Only the tokens after the cached prefix are evaluated ("w19 " no longer matches "w19"),
+    # but the fixed ttft remains.
+    second, second_sec = chat(server, prompt + " x y")
+    assert second["prompt_eval_count"] == 3
+    assert second["prompt_eval_duration"] == pytest.approx(0.03e9)
+    assert 0.07 <= second_sec < first_sec
@@ -0,0 +1,135 @@
+import json
+import stat
+import sys
+import textwrap
+
+import pytest
+
+from ollama_models import OllamaModelManager, parse_ollama_list, canonical_model_name
+
+GB = 1000 ** 3
+
+LIST_OUTPUT = """NAME                ID              SIZE      MODIFIED
+llama3.2:latest     a80c4f17acd5    2.0 GB    3 days ago
+tinydolphin:latest  0f9dd11f824c    636 MB    5 weeks ago
+phi3:3.8b           4f2222927938    2.2 GB    2 months ago
+"""
+
+
+def fake_ollama(tmp_path, installed, sizes):
+    # A stand-in `ollama` CLI keeping its installed models in a JSON file: list, pull and rm.
+    state = tmp_path / "ollama_state.json"
+    state.write_text(json.dumps({"installed": installed, "sizes": sizes, "calls": []}))
+    script = tmp_path / "ollama"
+    script.write_text(textwrap.dedent(f"""\
+        #!{sys.executable}
+        import json, sys
+        path = {str(state)!r}
+        state = json.load(open(path))
+        command, *args = sys.argv[1:]
+        state["calls"].append([command, *args])
+        if command == "list":
+            print("NAME ID SIZE MODIFIED")
+            for name in state["installed"]:
+                print(f"{{name}} abc123 {{state['sizes'][name] / 1e9:.1f}} GB now")
+        elif command == "pull":
+            if args[0] not in state["sizes"]:
+                print("pull model manifest: file does not exist", file=sys.stderr)
+                sys.exit(1)
+            state["installed"].append(args[0])
+        elif command == "rm":
+            state["installed"].remove(args[0])
+        json.dump(state, open(path, "w"))
+        """))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return script, state
+
+
+def read_state(state):
+    return json.loads(state.read_text())
+
+
+def test_parse_ollama_list():
+    assert parse_ollama_list(LIST_OUTPUT) == {
+        "llama3.2:latest": 2 * GB,
+        "tinydolphin:latest": 636 * 1000 ** 2,
+        "phi3:3.8b": int(2.2 * GB),
+    }
+    assert parse_ollama_list("NAME ID SIZE MODIFIED\n") == {}
+
+
+def test_canonical_model_name():
+    assert canonical_model_name("mistral") == "mistral:latest"
+    assert canonical_model_name("falcon:7b") == "falcon:7b"
+
+
+def test_ensure_pulls_missing_model_and_skips_installed(tmp_path):
+    script, state = fake_ollama(tmp_path, ["mistral:latest"], {"mistral:latest": GB, "falcon:7b": GB})
+    manager = OllamaModelManager(10 * GB, str(script), str(tmp_path / "usage.json"))
+
+    manager.ensure("mistral")
+    manager.ensure("falcon:7b")
+
+    pulls = [call for call in read_state(state)["calls"] if call[0] == "pull"]
+    assert pulls == [["pull", "falcon:7b"]]
+    assert set(json.loads((tmp_path / "usage.json").read_text())) == {"mistral:latest", "falcon:7b"}
+
+
+def test_ensure_raises_when_pull_fails(tmp_path):
+    script, _ = fake_ollama(tmp_path, [], {})
+    manager = OllamaModelManager(10 * GB, str(script), str(tmp_path / "usage.json"))
+    with pytest.raises(RuntimeError, match="Could not pull"):
+        manager.ensure("missing:7b")
+
+
+def test_evicts_least_recently_used_managed_models_over_budget(tmp_path):
+    sizes = {"a:latest": 2 * GB, "b:latest": 2 * GB, "c:latest": 2 * GB, "other:latest": 2 * GB}
+    script, state = fake_ollama(tmp_path, ["other:latest"], sizes)
+    manager = OllamaModelManager(7 * GB, str(script), str(tmp_path / "usage.json"))
+
+    manager.ensure("a")
+    manager.ensure("b")
+    manager.ensure("a")  # a is now more recently used than b
+    manager.ensure("c")
+
+    # 8 GB installed against a 7 GB budget: only b, the least recently used managed model,
+    # goes; the model this manager never pulled or used is not a candidate.
+    assert set(read_state(state)["installed"]) == {"a:latest", "c:latest", "other:latest"}
+
+
+def test_evict_keeps_requested_models(tmp_path):
+    sizes = {"a:latest": 3 * GB, "b:latest": 3 * GB}
+    script, state = fake_ollama(tmp_path, [], sizes)
+    manager = OllamaModelManager(4 * GB, str(script), str(tmp_path / "usage.json"))
+
+    manager.ensure("a")
+    manager.ensure("b", keep=["a"])
+
+    assert set(read_state(state)["installed"]) == {"a:latest", "b:latest"}
+
+
+def test_prefetch_then_ensure_pulls_once(tmp_path):
+    script, state = fake_ollama(tmp_path, [], {"a:latest": GB, "b:latest": GB})
+    manager = OllamaModelManager(10 * GB, str(script), str(tmp_path / "usage.json"))
+
+    manager.ensure("a", keep=["b"])
+    manager.prefetch("b")
+    manager.ensure("b")
+
+    pulls = [call for call in read_state(state)["calls"] if call[0] == "pull"]
+    assert pulls == [["pull", "a:latest"], ["pull", "b:latest"]]
+    assert not manager.prefetches
+    assert manager.report()["models"]["b:latest"]["pull_sec"] > 0
+
+
+def test_missing_cli_skips_model_management(tmp_path, capsys):
+    manager = OllamaModelManager(GB, str(tmp_path / "no-such-ollama"), str(tmp_path / "usage.json"))
+    assert "not found" in capsys.readouterr().out
+
+    manager.ensure("llama3.2")
+    manager.prefetch("mistral")
+    with manager.generating("llama3.2"):
+        pass
+
+    assert not manager.prefetches
+    assert manager.report()["totals"]["pull_sec"] == 0.0
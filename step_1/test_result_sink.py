@@ -0,0 +1,58 @@
+import csv
+
+import pytest
+
+from result_sink import BackgroundSink, CsvSink, ParquetSink
+
+
+def result_rows(start, count, **extra):
+    return [{"#": i, "response": f"text {i}", "duration_sec": 0.5, **extra} for i in range(start, start + count)]
+
+
+def test_csv_sink_appends_under_existing_header(tmp_path):
+    path = tmp_path / "results.csv"
+    assert CsvSink(str(path)).write(result_rows(1, 2))[0] == [1, 2]
+
+    # A new sink (e.g. after a resume) writes its rows in the order of the header on disk.
+    reordered = [{"duration_sec": 0.5, "response": "text 3", "#": 3}]
+    row_numbers, size = CsvSink(str(path)).write(reordered)
+
+    assert row_numbers == [3] and size == path.stat().st_size
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["#", "response", "duration_sec"]
+    assert rows[3] == ["3", "text 3", "0.5"]
+
+
+def test_csv_sink_refuses_rows_with_other_columns(tmp_path):
+    path = tmp_path / "results.csv"
+    CsvSink(str(path)).write(result_rows(1, 2))
+    before = path.read_bytes()
+
+    with pytest.raises(ValueError, match="Cannot append"):
+        CsvSink(str(path)).write(result_rows(3, 1, attempts=2))
+    assert path.read_bytes() == before
+
+
+def test_parquet_sink_commits_each_finished_part(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "results.parquet"
+    sink = ParquetSink(str(path), row_group_size=2, part_row_groups=2)
+
+    assert sink.write(result_rows(1, 3)) == ([], 0)
+    assert sink.write(result_rows(4, 2)) == ([1, 2, 3, 4], 0)
+    assert [p.name for p in path.glob("part-*.parquet")] == ["part-00000.parquet"]
+    assert sink.close() == ([5], 0)
+
+    assert sorted(p.name for p in path.glob("part-*.parquet")) == ["part-00000.parquet", "part-00001.parquet"]
+    assert pq.read_table(str(path)).column("#").to_pylist() == [1, 2, 3, 4, 5]
+    assert not list(path.glob("*.inprogress"))
+
+
+def test_background_sink_reports_committed_row_numbers(tmp_path):
+    commits = []
+    sink = BackgroundSink(CsvSink(str(tmp_path / "results.csv")), lambda rows, size: commits.append(rows))
+    for row in result_rows(1, 3):
+        sink.submit(row)
+    sink.close()
+    assert sorted(n for rows in commits for n in rows) == [1, 2, 3]
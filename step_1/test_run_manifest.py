@@ -0,0 +1,36 @@
+import pytest
+
+from run_manifest import RunManifest
+
+CELL = {"model": "llama3.2", "experiment": 1, "criteria": None}
+
+
+def test_resume_restores_completed_rows_and_truncates_partial_flush(tmp_path):
+    csv_path = tmp_path / "results.csv"
+    csv_path.write_bytes(b"header\nrow 1\n")
+    manifest = RunManifest(str(csv_path), CELL, 42, 0, 3)
+    manifest.commit([0], csv_path.stat().st_size)
+    with open(csv_path, "ab") as f:
+        f.write(b"half a ro")
+
+    resumed = RunManifest(str(csv_path), CELL, 42, 0, 3)
+    assert resumed.completed == {0}
+    assert not resumed.is_complete()
+    assert csv_path.read_bytes() == b"header\nrow 1\n"
+
+
+def test_resume_keeps_stored_scenario_offset(tmp_path):
+    csv_path = tmp_path / "results.csv"
+    RunManifest(str(csv_path), CELL, 42, 30, 10).commit([0, 1], 0)
+
+    # The same cell run on its own (or as part of a smaller sweep) gets another offset.
+    resumed = RunManifest(str(csv_path), CELL, 42, 0, 10)
+    assert resumed.scenario_offset == 30
+    assert resumed.completed == {0, 1}
+
+
+def test_resume_rejects_a_different_cell(tmp_path):
+    csv_path = tmp_path / "results.csv"
+    RunManifest(str(csv_path), CELL, 42, 0, 10).commit([0], 0)
+    with pytest.raises(ValueError, match="Cannot resume"):
+        RunManifest(str(csv_path), CELL, 7, 0, 10)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from prompt_text import PROMPT_TEMPLATES  # noqa: E402
+from scenario_generator import ScenarioGenerator, draw_sobol_design, take, SEED  # noqa: E402
+
+
+def legacy_scale_sobol_vector(vector):
+    # The per-row scaling script_generate_dataset.py used before the vectorized generator.
+    return {
+        "soil_nitrogen": round(vector[0] * 2000, 2),
+        "soil_potassium": round(vector[1] * 2000, 2),
+        "soil_phosphorous": round(vector[2] * 2000, 2),
+        "soil_ec": round(vector[3] * 10000, 2),
+        "ph": round(vector[4] * 14, 2),
+        "soil_temperature": round(10 + vector[5] * 30, 2),
+        "soil_moisture": round(20 + vector[6] * 60, 2),
+        "ambient_temperature": round(10 + vector[7] * 30, 2),
+        "atmospheric_humidity": round(vector[8] * 100, 2),
+        "days_since_planting": int(1 + vector[9] * 199),
+        "summary_hours": int(1 + vector[10] * 999),
+        "water_level": round(5 + vector[11] * 25, 2),
+    }
+
+
+def legacy_make_prompt(pcp, experiment, farm_type, rainfall_state, sunshine_intensity):
+    # The removed make_prompt, with its random choices passed in.
+    replacements = {
+        "farm_type": farm_type,
+        "days_since_planting": pcp["days_since_planting"],
+        "ph": pcp["ph"],
+        "soil_temperatute": pcp["soil_temperature"],
+        "soil_moisture": pcp["soil_moisture"],
+        "soil_nitrogen": pcp["soil_nitrogen"],
+        "soil_potassium": pcp["soil_potassium"],
+        "soil_phosphorous": pcp["soil_phosphorous"],
+        "soil_ec": pcp["soil_ec"],
+        "ambient_temperature": pcp["ambient_temperature"],
+        "atmospheric_humidity": pcp["atmospheric_humidity"],
+        "rainfall_state": rainfall_state,
+        "sunshine_intensity": sunshine_intensity,
+    }
+    prompt = PROMPT_TEMPLATES[experiment]
+    for key, value in replacements.items():
+        prompt = prompt.replace(f"%%{key}%%", str(value))
+    return prompt, replacements
+
+
+@pytest.mark.parametrize("experiment", sorted(PROMPT_TEMPLATES))
+def test_prompts_match_the_legacy_per_row_code(experiment):
+    design = draw_sobol_design(1000, SEED)
+    rows = take(ScenarioGenerator(1000, SEED), experiment, 0, 1000)
+    for vector, (prompt, replacements) in zip(design, rows):
+        expected = legacy_make_prompt(legacy_scale_sobol_vector(vector), experiment, replacements["farm_type"],
+                                      replacements["rainfall_state"], replacements["sunshine_intensity"])
+        assert (prompt, replacements) == expected
+
+
+def test_growing_the_design_keeps_earlier_rows_as_a_prefix():
+    small, large = ScenarioGenerator(100, SEED), ScenarioGenerator(3000, SEED)
+    assert np.array_equal(small.scenarios, large.scenarios[:len(small)])
+    assert take(small, 1, 40, 20) == take(large, 1, 40, 20)
+
+
+def test_saved_design_round_trips(tmp_path):
+    generator = ScenarioGenerator(64, SEED)
+    generator.save(str(tmp_path / "design.npy"))
+    assert take(ScenarioGenerator.load(str(tmp_path / "design.npy")), 2, 0, 64) == take(generator, 2, 0, 64)
+
+
+def test_take_rejects_rows_past_the_design():
+    with pytest.raises(ValueError, match="rows"):
+        take(ScenarioGenerator(16, SEED), 1, 10, 10)
@@ -0,0 +1,48 @@
+from score_cache import ScoreCache
+
+
+def result(prediction):
+    return {"prediction": prediction, "probabilities": {"SCORE_0": 1.0}}
+
+
+def count_rows(cache):
+    return cache.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+
+def test_put_then_get_hits_normalized_text(tmp_path):
+    cache = ScoreCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("fp", ["a  text"], [result(3)])
+    found = cache.get_many("fp", ["a text", "other"])
+    assert list(found) == [0] and found[0]["prediction"] == 3 and found[0]["cached"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.get_many("other-fp", ["a text"]) == {}
+
+
+def test_eviction_keeps_max_entries_most_recent(tmp_path):
+    cache = ScoreCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+    for n in range(5):
+        cache.put_many("fp", [f"text {n}"], [result(n)])
+    assert count_rows(cache) == 3
+    assert sorted(cache.get_many("fp", [f"text {n}" for n in range(5)])) == [2, 3, 4]
+
+
+def test_count_runs_only_near_the_limit(tmp_path):
+    cache = ScoreCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    statements = []
+    cache.conn.set_trace_callback(statements.append)
+    for n in range(10):
+        cache.put_many("fp", [f"text {n}"], [result(n)])
+    assert sum("COUNT(*)" in statement for statement in statements) == 1
+
+
+def test_fingerprint_covers_extra_files(tmp_path):
+    cache = ScoreCache(str(tmp_path / "cache.sqlite"))
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "config.json").write_text("{}")
+    export = tmp_path / "model.onnx"
+    export.write_bytes(b"graph 1")
+    first = cache.fingerprint(model_dir, model_dir, "onnx", [export])
+    assert first == cache.fingerprint(model_dir, model_dir, "onnx", [export])
+    export.write_bytes(b"graph 2!")
+    assert cache.fingerprint(model_dir, model_dir, "onnx", [export]) != first
@@ -0,0 +1,59 @@
+import pytest
+
+from streaming_judge import failing_criteria, probability_below
+from taaj_jury import SCORE_LABELS
+
+
+class RecordingJury:
+    # Returns one fixed verdict and records how evaluate() was called.
+    def __init__(self, probabilities):
+        self.probabilities = dict(zip(SCORE_LABELS, probabilities))
+        self.calls = []
+
+    def evaluate(self, texts, use_cache=True):
+        self.calls.append((list(texts), use_cache))
+        return [{"safety_score": {"prediction": 0, "probabilities": self.probabilities}} for _ in texts]
+
+
+def test_probability_below():
+    verdict = {"probabilities": dict(zip(SCORE_LABELS, [0.1, 0.2, 0.3, 0.2, 0.1, 0.1]))}
+    assert probability_below(verdict, 2) == pytest.approx(0.3)
+    assert probability_below(verdict, 0) == 0
+
+
+def test_failing_criteria_scores_partial_text_without_cache():
+    jury = RecordingJury([0.7, 0.2, 0.1, 0.0, 0.0, 0.0])
+    assert failing_criteria(jury, "partial text", {"safety_score": 2}, 0.8) == {"safety_score": pytest.approx(0.9)}
+    assert failing_criteria(jury, "partial text", {"safety_score": 1}, 0.8) == {}
+    assert jury.calls == [(["partial text"], False)] * 2
+
+
+class StreamingClient:
+    # Streams `tokens` one chunk each, then the final stats chunk, like ollama.Client(stream=True).
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def chat(self, model, messages, stream, keep_alive=None):
+        for token in self.tokens:
+            yield {"message": {"content": token}, "done": False}
+        yield {"message": {"content": ""}, "done": True, "prompt_eval_count": 7}
+
+
+def test_stream_attempt_does_not_count_the_final_chunk():
+    from streaming_judge import stream_attempt
+
+    result = stream_attempt(StreamingClient(["a ", "b ", "c."]), "m", "prompt", None, {}, False, 32, None, 24, 0.8)
+    assert result["content"] == "a b c."
+    assert result["tokens"] == 3
+    assert result["prompt_eval_count"] == 7
+
+
+def test_checkpoints_every_n_sentences_cancel_a_failing_generation():
+    from streaming_judge import stream_attempt
+
+    jury = RecordingJury([0.9, 0.1, 0.0, 0.0, 0.0, 0.0])
+    tokens = ["One.", " Two.", " Three.", " Four."]
+    result = stream_attempt(StreamingClient(tokens), "m", "prompt", jury, {"safety_score": 2}, True,
+                            0, 2, 1, 0.8)
+    assert result["aborted"] and result["content"] == "One. Two."
+    assert jury.calls == [(["One. Two."], False)]
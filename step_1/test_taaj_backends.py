@@ -0,0 +1,45 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+import taaj_backends  # noqa: E402
+from taaj_backends import load_taaj_backend, onnx_export_path  # noqa: E402
+
+
+def save_tiny_judge(model_path, seed):
+    torch.manual_seed(seed)
+    config = transformers.DistilBertConfig(vocab_size=64, dim=16, n_layers=1, n_heads=2, hidden_dim=32,
+                                           max_position_embeddings=64, num_labels=6)
+    transformers.DistilBertForSequenceClassification(config).save_pretrained(str(model_path))
+
+
+def logits(model, ids):
+    with torch.no_grad():
+        return model(input_ids=ids, attention_mask=torch.ones_like(ids)).logits
+
+
+def test_onnx_export_follows_the_weights(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(taaj_backends, "ONNX_EXPORT_DIR", str(tmp_path / "onnx"))
+    model_path = tmp_path / "fine_tuned_taaj_model_x" / "final_model"
+    ids = torch.tensor([[1, 5, 9, 2]])
+    save_tiny_judge(model_path, 0)
+
+    onnx_model = load_taaj_backend(model_path, "onnx")
+    assert onnx_export_path(model_path).is_relative_to(tmp_path / "onnx")
+    assert not list(model_path.glob("*.onnx"))
+    torch.testing.assert_close(logits(onnx_model, ids), logits(load_taaj_backend(model_path), ids),
+                               rtol=1e-4, atol=1e-4)
+
+    capsys.readouterr()
+    load_taaj_backend(model_path, "onnx")
+    assert "Exporting" not in capsys.readouterr().out
+
+    # Retrained weights at the same path get a fresh export.
+    save_tiny_judge(model_path, 1)
+    onnx_model = load_taaj_backend(model_path, "onnx")
+    assert "Exporting" in capsys.readouterr().out
+    torch.testing.assert_close(logits(onnx_model, ids), logits(load_taaj_backend(model_path), ids),
+                               rtol=1e-4, atol=1e-4)
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("safetensors")
+
+from taaj_bundle import (BUNDLE_INDEX_FILE, BUNDLE_WEIGHTS_FILE, Int8Embedding, Int8Linear,  # noqa: E402
+                         build_bundle, decode_tensor, dedup_tensors, encode_tensor, load_bundle)
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + [f"w{n}" for n in range(59)]
+TEXTS = [" ".join(f"w{(n * 7 + k) % 59}" for k in range(3 + n % 9)) for n in range(40)]
+
+
+def tiny_judge(seed):
+    torch.manual_seed(seed)
+    config = transformers.DistilBertConfig(vocab_size=len(VOCAB), dim=16, n_layers=1, n_heads=2, hidden_dim=32,
+                                           max_position_embeddings=64, num_labels=6)
+    return transformers.DistilBertForSequenceClassification(config).eval()
+
+
+def save_criteria(model_dir, models):
+    # The fine_tuned_taaj_model_<criterion>/{final_model,tokenizer} layout the jury reads.
+    for criterion, model in models.items():
+        root = model_dir / f"fine_tuned_taaj_model_{criterion}"
+        model.save_pretrained(str(root / "final_model"))
+        (root / "tokenizer").mkdir(parents=True)
+        (root / "tokenizer" / "vocab.txt").write_text("\n".join(VOCAB) + "\n")
+        transformers.DistilBertTokenizerFast(str(root / "tokenizer" / "vocab.txt")).save_pretrained(
+            str(root / "tokenizer"))
+
+
+def two_criteria_sharing_layers():
+    # Same seed: identical embeddings and encoder; the classifier heads differ.
+    first, second = tiny_judge(0), tiny_judge(0)
+    with torch.no_grad():
+        second.classifier.weight.add_(0.5)
+    return {"relevance_score": first, "safety_score": second}
+
+
+def test_dedup_shares_identical_tensors_only():
+    models = two_criteria_sharing_layers()
+    unique, index = dedup_tensors(models, atol=0)
+    assert index["relevance_score"]["distilbert.embeddings.word_embeddings.weight"] == \
+        index["safety_score"]["distilbert.embeddings.word_embeddings.weight"]
+    assert index["relevance_score"]["classifier.weight"] != index["safety_score"]["classifier.weight"]
+    assert len(unique) == len(index["relevance_score"]) + 1
+
+
+def test_int8_encode_decode_round_trip():
+    tensor = torch.randn(8, 16)
+    encoded = encode_tensor("w", tensor, "int8")
+    assert encoded["w"].dtype == torch.int8 and encoded["w.scale"].shape == (8, 1)
+
+    class Weights:
+        def get_tensor(self, key):
+            return encoded[key]
+
+        def keys(self):
+            return encoded.keys()
+
+    decoded = decode_tensor(Weights(), "w", torch.float32)
+    assert (decoded - tensor).abs().max() <= tensor.abs().amax(dim=1).max() / 127
+
+
+@pytest.mark.parametrize("dtype", ["fp16", "int8"])
+def test_bundle_round_trip(tmp_path, dtype):
+    models = two_criteria_sharing_layers()
+    save_criteria(tmp_path / "models", models)
+    summary = build_bundle(list(models), str(tmp_path / "models"), str(tmp_path / "bundle"), dtype, atol=0,
+                           validation_texts=TEXTS, min_agreement=0.9)
+    assert set(summary["validation"]) == {"fp32", "fp16"}
+    assert summary["unique_tensors"] < summary["tensors"]
+
+    _, loaded = load_bundle(tmp_path / "bundle")
+    if dtype == "int8":
+        # Linear and Embedding weights stay int8 at runtime, shared across criteria.
+        relevance, safety = loaded["relevance_score"], loaded["safety_score"]
+        assert isinstance(relevance.distilbert.embeddings.word_embeddings, Int8Embedding)
+        assert isinstance(relevance.pre_classifier, Int8Linear)
+        assert relevance.pre_classifier.weight.dtype == torch.int8
+        assert relevance.pre_classifier is safety.pre_classifier
+        assert relevance.classifier is not safety.classifier
+    ids = torch.tensor([[2, 10, 11, 12, 3]])
+    for criterion, model in models.items():
+        with torch.no_grad():
+            expected = model(input_ids=ids).logits
+            actual = loaded[criterion](input_ids=ids).logits
+        torch.testing.assert_close(actual, expected, atol=0.05, rtol=0.05)
+
+
+def test_missing_tensor_is_reported(tmp_path):
+    models = {"relevance_score": tiny_judge(0)}
+    save_criteria(tmp_path / "models", models)
+    build_bundle(list(models), str(tmp_path / "models"), str(tmp_path / "bundle"), "fp16", atol=0,
+                 validation_texts=TEXTS, min_agreement=0.9)
+    index_path = tmp_path / "bundle" / BUNDLE_INDEX_FILE
+    meta = json.loads(index_path.read_text())
+    del meta["criteria"]["relevance_score"]["tensors"]["classifier.bias"]
+    index_path.write_text(json.dumps(meta))
+    assert (tmp_path / "bundle" / BUNDLE_WEIGHTS_FILE).exists()
+
+    with pytest.raises(ValueError, match="missing tensors.*classifier.bias"):
+        load_bundle(tmp_path / "bundle")
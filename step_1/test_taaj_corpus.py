@@ -0,0 +1,57 @@
+import csv
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from taaj_corpus import TokenCorpus, build_corpus  # noqa: E402
+from taaj_jury import Jury  # noqa: E402
+from test_taaj_bundle import TEXTS, save_criteria, tiny_judge  # noqa: E402
+
+
+def write_results(path, texts):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=["#", "response"])
+        writer.writeheader()
+        writer.writerows({"#": n, "response": text} for n, text in enumerate(texts, start=1))
+
+
+@pytest.fixture
+def corpus_setup(tmp_path):
+    save_criteria(tmp_path / "models", {"relevance_score": tiny_judge(0), "safety_score": tiny_judge(1)})
+    # Same file name in two directories, as the per-run data/ folders have.
+    paths = [tmp_path / "run1" / "responses.csv", tmp_path / "run2" / "responses.csv"]
+    write_results(paths[0], TEXTS[:25])
+    write_results(paths[1], TEXTS[25:])
+    tokenizer_dir = tmp_path / "models" / "fine_tuned_taaj_model_relevance_score" / "tokenizer"
+    build_corpus([str(p) for p in paths], str(tokenizer_dir), str(tmp_path / "corpus"))
+    return tmp_path, paths
+
+
+def test_row_ids_keep_same_named_files_apart(corpus_setup):
+    tmp_path, paths = corpus_setup
+    corpus = TokenCorpus(str(tmp_path / "corpus"))
+    assert len(corpus) == 40
+    assert corpus.index_of(f"{paths[0]}:1") == 0
+    assert corpus.index_of(f"{paths[1]}:1") == 25
+
+
+def test_corpus_scores_match_scoring_the_texts(corpus_setup):
+    tmp_path, _ = corpus_setup
+    jury = Jury(["relevance_score", "safety_score"], str(tmp_path / "models"))
+    expected = jury.evaluate(TEXTS, use_cache=False)
+    actual = list(jury.evaluate_corpus(TokenCorpus(str(tmp_path / "corpus"))))
+    for want, got in zip(expected, actual, strict=True):
+        for criterion in jury.criteria:
+            assert got[criterion]["prediction"] == want[criterion]["prediction"]
+            for label, probability in want[criterion]["probabilities"].items():
+                assert got[criterion]["probabilities"][label] == pytest.approx(probability, abs=1e-5)
+
+
+def test_evaluate_corpus_rejects_window_pooling(corpus_setup):
+    tmp_path, _ = corpus_setup
+    jury = Jury(["relevance_score"], str(tmp_path / "models"), window_pooling="mean")
+    with pytest.raises(ValueError, match="window pooling"):
+        next(jury.evaluate_corpus(TokenCorpus(str(tmp_path / "corpus"))))
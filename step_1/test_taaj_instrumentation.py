@@ -0,0 +1,21 @@
+import pytest
+
+from taaj_instrumentation import SpanRecorder, peak_rss_mb, reset_peak_rss
+
+
+def test_span_recorder_summary_counts_spans():
+    spans = SpanRecorder()
+    for _ in range(3):
+        with spans.span("forward"):
+            pass
+    assert spans.summary()["forward"]["count"] == 3
+
+
+def test_reset_peak_rss_forgets_earlier_peaks():
+    block = bytearray(256 * 1024 * 1024)
+    block[::4096] = b"\x01" * len(block[::4096])
+    del block
+    high = peak_rss_mb()
+    if not reset_peak_rss():
+        pytest.skip("the peak RSS cannot be reset on this platform")
+    assert peak_rss_mb() < high - 128
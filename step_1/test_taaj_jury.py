@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+from taaj_instrumentation import SpanRecorder
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from taaj_jury import (SCORE_LABELS, bucket_by_length, score_long_token_ids, score_token_ids,  # noqa: E402
+                       split_windows)
+
+TOKENIZER = SimpleNamespace(cls_token_id=1, sep_token_id=2, pad_token_id=0)
+
+
+def tiny_judge():
+    torch.manual_seed(0)
+    config = transformers.DistilBertConfig(vocab_size=64, dim=16, n_layers=1, n_heads=2, hidden_dim=32,
+                                           max_position_embeddings=64, num_labels=len(SCORE_LABELS))
+    return transformers.DistilBertForSequenceClassification(config).eval()
+
+
+def test_split_windows_cover_every_token():
+    ids = list(range(3, 23))
+    windows = split_windows(ids, 1, 2, 0, max_length=10, stride=2)
+    assert all(len(window) == 10 and window[0] == 1 and window[-1] == 2 for window in windows)
+    assert sorted({token for window in windows for token in window[1:-1]}) == ids
+    assert split_windows([5, 6], 1, 2, 0, max_length=10, stride=2) == [(1, 5, 6, 2)]
+
+
+def test_response_time_is_the_forward_time_not_a_multiple(monkeypatch):
+    import taaj_jury
+
+    spans_seconds = []
+    original = taaj_jury.SpanRecorder.last_seconds
+
+    def record(self, name):
+        seconds = original(self, name)
+        if name == "forward":
+            spans_seconds.append(seconds)
+        return seconds
+
+    monkeypatch.setattr(taaj_jury.SpanRecorder, "last_seconds", record)
+    sequence = [3 + n % 60 for n in range(40)]
+    result = score_long_token_ids([sequence], {"judge": tiny_judge()}, TOKENIZER, torch.device("cpu"),
+                                  max_tokens_per_batch=4096, max_length=16, stride=4)[0]["judge"]
+    # All windows have the same length, so they share one bucket and one forward pass.
+    assert result["windows"] > 1 and len(spans_seconds) == 1
+    assert result["response_time"] == pytest.approx(spans_seconds[0])
+
+
+def test_bucket_by_length_respects_the_padded_token_budget():
+    lengths = [5, 40, 7, 12, 33, 8, 40, 2, 19, 25]
+    buckets = list(bucket_by_length(lengths, max_tokens_per_batch=64))
+    assert sorted(idx for bucket in buckets for idx in bucket) == list(range(len(lengths)))
+    for bucket in buckets:
+        assert len(bucket) == 1 or max(lengths[idx] for idx in bucket) * len(bucket) <= 64
+
+
+def test_results_come_back_in_input_order_with_per_text_time():
+    model = tiny_judge()
+    sequences = [[1] + [3 + (n * k) % 60 for k in range(length)] + [2]
+                 for n, length in enumerate([30, 3, 12, 3, 25, 7])]
+    spans = SpanRecorder()
+    batched = score_token_ids(sequences, {"judge": model}, 0, torch.device("cpu"), 64, spans)
+    for sequence, result in zip(sequences, batched):
+        alone = score_token_ids([sequence], {"judge": model}, 0, torch.device("cpu"))[0]["judge"]
+        assert result["judge"]["prediction"] == alone["prediction"]
+        for label in SCORE_LABELS:
+            assert result["judge"]["probabilities"][label] == pytest.approx(alone["probabilities"][label], abs=1e-5)
+    # Texts of one bucket split its forward time: the per-text times add up to the passes.
+    assert max(result["judge"]["batch_size"] for result in batched) > 1
+    assert sum(result["judge"]["response_time"] for result in batched) == \
+        pytest.approx(spans.summary()["forward"]["total_ms"] / 1000, rel=1e-6)